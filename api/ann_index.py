@@ -0,0 +1,147 @@
+import os
+import time
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+
+class IVFIndex:
+    """Inverted-file ANN index over row-normalized vectors.
+
+    Vectors are assigned to the nearest of `n_lists` k-means centroids; a search only scans
+    the `n_probe` lists closest to the query. Raising n_probe trades latency for recall.
+    Rows are the row numbers of the owning matrix, so the index stores no vectors itself.
+    """
+
+    def __init__(self, n_lists: int = 256, n_probe: int = 8, train_iterations: int = 10, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_iterations = train_iterations
+        self.seed = seed
+        self.centroids = None
+        self.lists = []
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: np.ndarray, sample_size: int = 100000):
+        """Fit the coarse quantizer with spherical k-means on a sample, then assign every row"""
+        rng = np.random.default_rng(self.seed)
+        n_lists = max(1, min(self.n_lists, vectors.shape[0]))
+
+        sample = vectors
+        if vectors.shape[0] > sample_size:
+            sample = vectors[rng.choice(vectors.shape[0], sample_size, replace=False)]
+        sample = np.asarray(sample, dtype=np.float32)
+
+        centroids = sample[rng.choice(sample.shape[0], n_lists, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[assignment == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids /= norms
+
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.lists = [np.zeros(0, dtype=np.int64) for _ in range(n_lists)]
+        self.add(vectors, start_row=0)
+
+    def add(self, vectors: np.ndarray, start_row: int):
+        """Incrementally assign new rows (start_row, start_row + 1, ...) to their nearest list"""
+        if not self.is_trained or len(vectors) == 0:
+            return
+        assignment = self._nearest_lists(np.asarray(vectors, dtype=np.float32), 1)[:, 0]
+        rows = np.arange(start_row, start_row + len(vectors), dtype=np.int64)
+        for c in np.unique(assignment):
+            self.lists[c] = np.concatenate([self.lists[c], rows[assignment == c]])
+
+    def update(self, vectors: np.ndarray, rows: np.ndarray):
+        """Re-assign existing rows whose vectors changed"""
+        if not self.is_trained or len(rows) == 0:
+            return
+        rows = np.asarray(rows, dtype=np.int64)
+        self.lists = [members[~np.isin(members, rows)] for members in self.lists]
+        assignment = self._nearest_lists(np.asarray(vectors, dtype=np.float32), 1)[:, 0]
+        for c in np.unique(assignment):
+            self.lists[c] = np.concatenate([self.lists[c], rows[assignment == c]])
+
+    def remove(self, keep: np.ndarray):
+        """Drop rows where keep is False and renumber the survivors, matching a compacted matrix"""
+        new_row = np.cumsum(keep) - 1
+        self.lists = [new_row[rows[keep[rows]]] for rows in self.lists]
+
+    def candidates(self, query: np.ndarray, n_probe: Optional[int] = None) -> np.ndarray:
+        """Rows stored in the lists nearest to the query"""
+        n_probe = min(n_probe or self.n_probe, len(self.lists))
+        probes = self._nearest_lists(query.reshape(1, -1), n_probe)[0]
+        return np.concatenate([self.lists[c] for c in probes])
+
+    def save(self, path: str):
+        sizes = np.array([len(rows) for rows in self.lists], dtype=np.int64)
+        np.savez(
+            path,
+            centroids=self.centroids,
+            sizes=sizes,
+            rows=np.concatenate(self.lists) if self.lists else np.zeros(0, dtype=np.int64),
+            params=np.array([self.n_lists, self.n_probe, self.train_iterations, self.seed], dtype=np.int64)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        data = np.load(path)
+        n_lists, n_probe, train_iterations, seed = (int(x) for x in data["params"])
+        index = cls(n_lists=n_lists, n_probe=n_probe, train_iterations=train_iterations, seed=seed)
+        index.centroids = data["centroids"]
+        index.lists = list(np.split(data["rows"], np.cumsum(data["sizes"])[:-1]))
+        return index
+
+    def _nearest_lists(self, vectors: np.ndarray, count: int) -> np.ndarray:
+        scores = vectors @ self.centroids.T
+        if count >= scores.shape[1]:
+            return np.argsort(-scores, axis=1)
+        top = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        return np.take_along_axis(top, order, axis=1)
+
+
+def recall_report(matrix: np.ndarray, index: IVFIndex, queries: np.ndarray, k: int = 10,
+                  n_probes: List[int] = None) -> List[Dict[str, Any]]:
+    """Recall@k and mean latency of the IVF index against exact brute-force search"""
+    if n_probes is None:
+        n_probes = [1, 2, 4, 8, 16, 32]
+
+    exact = []
+    start = time.perf_counter()
+    for query in queries:
+        scores = matrix @ query
+        exact.append(set(np.argpartition(-scores, k - 1)[:k].tolist()))
+    brute_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    report = []
+    for n_probe in n_probes:
+        hits = 0
+        start = time.perf_counter()
+        for query, truth in zip(queries, exact):
+            rows = index.candidates(query, n_probe)
+            scores = matrix[rows] @ query
+            top = rows[np.argpartition(-scores, min(k, len(rows)) - 1)[:k]] if len(rows) else rows
+            hits += len(truth.intersection(top.tolist()))
+        report.append({
+            "n_probe": n_probe,
+            "recall_at_k": hits / (k * len(queries)),
+            "ann_ms": (time.perf_counter() - start) * 1000 / len(queries),
+            "brute_force_ms": brute_ms
+        })
+    return report
+
+
+def index_from_env() -> IVFIndex:
+    """IVF index configured by ANN_N_LISTS and ANN_N_PROBE"""
+    return IVFIndex(
+        n_lists=int(os.getenv("ANN_N_LISTS", "256")),
+        n_probe=int(os.getenv("ANN_N_PROBE", "8"))
+    )
@@ -0,0 +1,224 @@
+import hashlib
+import os
+import pickle
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class CacheBackend(ABC):
+    """Key/value store used by the query cache; subclass to share it between workers"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Atomically increment a counter that is never evicted"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_counter(self, key: str) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class InMemoryCache(CacheBackend):
+    """Per-process LRU cache with TTL expiry and a bounded memory budget"""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 default_ttl: Optional[float] = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.entries = OrderedDict()  # key -> (expires_at, size, value)
+        self.counters = {}
+        self.current_bytes = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, _, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (expires_at, size, value)
+            self.current_bytes += size
+            while len(self.entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+
+    def incr(self, key: str) -> int:
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+            return self.counters[key]
+
+    def get_counter(self, key: str) -> int:
+        return self.counters.get(key, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "entries": len(self.entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions
+        }
+
+    def _remove(self, key: str):
+        _, size, _ = self.entries.pop(key)
+        self.current_bytes -= size
+
+
+class RedisCache(CacheBackend):
+    """Redis-backed cache so several uvicorn workers share entries and invalidations"""
+
+    def __init__(self, url: str, default_ttl: Optional[float] = 3600, prefix: str = "convosearch:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_URL points at Redis but the 'redis' package is not installed")
+
+        self.client = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        # Eviction under memory pressure is left to Redis' maxmemory-policy (allkeys-lru)
+        self.client.set(self.prefix + key, raw, ex=int(ttl) if ttl else None)
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(self.prefix + key))
+
+    def get_counter(self, key: str) -> int:
+        raw = self.client.get(self.prefix + key)
+        return int(raw) if raw is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis"}
+
+
+def normalize_query(text: str) -> str:
+    """Collapse case, whitespace and trailing punctuation so near-identical questions share entries"""
+    text = re.sub(r"\s+", " ", text.lower()).strip()
+    return text.rstrip("?!. ")
+
+
+class QueryCache:
+    """Caches query embeddings and per-collection search results for RAGEngine"""
+
+    def __init__(self, backend: CacheBackend, embedding_ttl: Optional[float] = None,
+                 results_ttl: Optional[float] = None):
+        self.backend = backend
+        self.embedding_ttl = embedding_ttl
+        self.results_ttl = results_ttl
+        self.counts = {"embedding_hits": 0, "embedding_misses": 0, "results_hits": 0, "results_misses": 0}
+
+    def get_embedding(self, query: str) -> Optional[List[float]]:
+        value = self.backend.get(self._embedding_key(query))
+        self._count("embedding", value is not None)
+        return value
+
+    def set_embedding(self, query: str, embedding: List[float]):
+        self.backend.set(self._embedding_key(query), list(embedding), ttl=self.embedding_ttl)
+
+    def get_results(self, query: str, collection_name: str, n_results: int) -> Optional[Dict[str, Any]]:
+        value = self.backend.get(self._results_key(query, collection_name, n_results))
+        self._count("results", value is not None)
+        return value
+
+    def set_results(self, query: str, collection_name: str, n_results: int, results: Dict[str, Any]):
+        self.backend.set(self._results_key(query, collection_name, n_results), results, ttl=self.results_ttl)
+
+    def invalidate_collection(self, collection_name: str):
+        """Bump the collection version so every cached result for it is bypassed"""
+        self.backend.incr(f"version:{collection_name}")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self.counts)
+        for kind in ("embedding", "results"):
+            total = stats[f"{kind}_hits"] + stats[f"{kind}_misses"]
+            stats[f"{kind}_hit_rate"] = stats[f"{kind}_hits"] / total if total else 0.0
+        stats.update(self.backend.stats())
+        return stats
+
+    def _count(self, kind: str, hit: bool):
+        self.counts[f"{kind}_{'hits' if hit else 'misses'}"] += 1
+
+    def _embedding_key(self, query: str) -> str:
+        return f"emb:{self._digest(query)}"
+
+    def _results_key(self, query: str, collection_name: str, n_results: int) -> str:
+        version = self.backend.get_counter(f"version:{collection_name}")
+        return f"res:{collection_name}:{version}:{n_results}:{self._digest(query)}"
+
+    @staticmethod
+    def _digest(query: str) -> str:
+        return hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+
+
+_query_cache = None
+
+
+def get_query_cache() -> QueryCache:
+    """Process-wide query cache; set CACHE_URL=redis://... to share it between workers"""
+    global _query_cache
+    if _query_cache is None:
+        ttl = float(os.getenv("CACHE_TTL", "3600"))
+        url = os.getenv("CACHE_URL")
+        if url:
+            backend = RedisCache(url, default_ttl=ttl)
+        else:
+            backend = InMemoryCache(
+                max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "10000")),
+                max_bytes=int(os.getenv("CACHE_MAX_MB", "64")) * 1024 * 1024,
+                default_ttl=ttl
+            )
+        _query_cache = QueryCache(backend)
+    return _query_cache
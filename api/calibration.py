@@ -0,0 +1,110 @@
+import json
+import math
+import os
+import threading
+from typing import List, Dict, Any, Optional
+
+# Below this many observations a collection's statistics are too noisy to standardize with
+MIN_OBSERVATIONS = 20
+
+
+def distance_to_similarity(distance: float, metric: str) -> float:
+    """Cosine similarity behind a vector-store distance, assuming unit-length embeddings.
+
+    Chroma's "l2" is the squared euclidean distance, which for unit vectors is 2 - 2cos;
+    "cosine" and "ip" distances are both 1 - cos.
+    """
+    if metric == "l2":
+        return 1.0 - distance / 2.0
+    return 1.0 - distance
+
+
+def similarity_to_distance(similarity: float, metric: str) -> float:
+    """Inverse of distance_to_similarity, for hits scored outside the vector store"""
+    if metric == "l2":
+        return 2.0 - 2.0 * similarity
+    return 1.0 - similarity
+
+
+class ConfidenceCalibrator:
+    """Maps raw distances to confidences comparable across collections.
+
+    At ingest time every collection records the similarity between newly added chunks and
+    their nearest neighbour, a cheap estimate of what a "good match" looks like in that
+    collection. A query hit is scored by how many standard deviations its similarity sits
+    from that mean, squashed through a logistic: 0.5 means "as close as a typical
+    neighbouring chunk". Dense collections (everything similar to everything) no longer
+    outrank sparse ones just by having higher raw similarities.
+
+    Statistics are running (Welford) mean/variance, kept in CALIBRATION_PATH as JSON.
+    """
+
+    def __init__(self, path: str = None, slope: float = None):
+        self.path = path or os.getenv("CALIBRATION_PATH", "data/calibration.json")
+        self.slope = slope if slope is not None else float(os.getenv("CALIBRATION_SLOPE", "1.7"))
+        self.lock = threading.Lock()
+        self.stats = self._load()
+
+    def observe(self, collection_name: str, similarities: List[float]):
+        """Fold nearest-neighbour similarities from an ingest batch into the collection's statistics"""
+        with self.lock:
+            stats = self.stats.setdefault(collection_name, {"count": 0, "mean": 0.0, "m2": 0.0})
+            for similarity in similarities:
+                stats["count"] += 1
+                delta = similarity - stats["mean"]
+                stats["mean"] += delta / stats["count"]
+                stats["m2"] += delta * (similarity - stats["mean"])
+
+    def confidence(self, collection_name: str, distance: Optional[float], metric: str) -> float:
+        if distance is None:
+            return 0.5
+        similarity = distance_to_similarity(distance, metric)
+
+        stats = self.stats.get(collection_name)
+        if not stats or stats["count"] < MIN_OBSERVATIONS:
+            # Uncalibrated collection: fall back to the raw similarity
+            return min(1.0, max(0.0, similarity))
+
+        std = math.sqrt(stats["m2"] / (stats["count"] - 1)) or 1e-6
+        z = (similarity - stats["mean"]) / std
+        return 1.0 / (1.0 + math.exp(-max(-50.0, min(50.0, self.slope * z))))
+
+    def reset(self, collection_name: str):
+        with self.lock:
+            self.stats.pop(collection_name, None)
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {
+                name: {
+                    "count": stats["count"],
+                    "mean": stats["mean"],
+                    "std": math.sqrt(stats["m2"] / (stats["count"] - 1)) if stats["count"] > 1 else 0.0
+                }
+                for name, stats in self.stats.items()
+            }
+
+    def save(self):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.stats, f)
+            os.replace(tmp_path, self.path)
+
+    def _load(self) -> Dict[str, Dict[str, float]]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+
+_calibrator = None
+
+
+def get_calibrator() -> ConfidenceCalibrator:
+    """Process-wide calibrator shared by ingestion and retrieval"""
+    global _calibrator
+    if _calibrator is None:
+        _calibrator = ConfidenceCalibrator()
+    return _calibrator
@@ -0,0 +1,128 @@
+import os
+import re
+from typing import List, Dict, Any, Set
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+WORD_PATTERN = re.compile(r"\w+")
+
+# Per-chunk prompt overhead: the "- " bullet and newline AnswerGenerator adds around each chunk
+CHUNK_OVERHEAD_TOKENS = 2
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken when it is installed, else estimates ~4 characters per token"""
+
+    def __init__(self, encoding: str = None):
+        self.encoder = None
+        try:
+            import tiktoken
+            self.encoder = tiktoken.get_encoding(encoding or os.getenv("TOKEN_ENCODING", "cl100k_base"))
+        except Exception:
+            pass
+
+    def __call__(self, text: str) -> int:
+        if self.encoder is not None:
+            return len(self.encoder.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+
+class ContextPacker:
+    """Selects prompt context from ranked sources under a token budget.
+
+    Sources are taken in relevance order. A source whose word shingles overlap an already
+    chosen one by `dedup_threshold` (Jaccard) or more is dropped as a near-duplicate. A source
+    that no longer fits is cut back to whole sentences (or whole words, for text without
+    sentence terminators) if at least `min_chunk_tokens` of budget remain; otherwise it is
+    skipped and smaller, less relevant sources may still fill the gap.
+    """
+
+    def __init__(self, token_budget: int = None, dedup_threshold: float = None, min_chunk_tokens: int = None,
+                 max_candidates: int = None):
+        self.token_budget = token_budget or int(os.getenv("CONTEXT_TOKEN_BUDGET", "1024"))
+        self.dedup_threshold = dedup_threshold if dedup_threshold is not None else \
+            float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+        self.min_chunk_tokens = min_chunk_tokens or int(os.getenv("CONTEXT_MIN_CHUNK_TOKENS", "32"))
+        # How many ranked sources retrieval hands over for packing
+        self.max_candidates = max_candidates or int(os.getenv("CONTEXT_CANDIDATES", "8"))
+        self.count_tokens = TokenCounter()
+
+    def pack(self, sources: List[Dict[str, Any]], token_budget: int = None) -> Dict[str, Any]:
+        budget = token_budget or self.token_budget
+        used = 0
+        packed = []
+        shingles = []
+        duplicates = 0
+
+        for source in sources[:self.max_candidates]:
+            remaining = budget - used - CHUNK_OVERHEAD_TOKENS
+            if remaining < self.min_chunk_tokens:
+                break
+
+            source_shingles = self._shingles(source["content"])
+            if any(self._jaccard(source_shingles, other) >= self.dedup_threshold for other in shingles):
+                duplicates += 1
+                continue
+
+            content = source["content"]
+            tokens = self.count_tokens(content)
+            truncated = False
+            if tokens > remaining:
+                content, tokens = self._truncate(content, remaining)
+                if not content:
+                    continue
+                truncated = True
+
+            packed.append(dict(source, content=content, tokens=tokens, truncated=truncated))
+            shingles.append(source_shingles)
+            used += tokens + CHUNK_OVERHEAD_TOKENS
+
+        return {
+            "context": [source["content"] for source in packed],
+            "sources": packed,
+            "tokens_used": used,
+            "token_budget": budget,
+            "dropped_duplicates": duplicates
+        }
+
+    def _truncate(self, text: str, max_tokens: int):
+        """Longest prefix of whole sentences within max_tokens, with its token count.
+
+        Falls back to whole words when not even the first sentence fits, which is also the
+        case for parser chunks: the parser splits on terminators and drops them.
+        """
+        kept = []
+        tokens = 0
+        for sentence in SENTENCE_BOUNDARY.split(text):
+            candidate = " ".join(kept + [sentence])
+            candidate_tokens = self.count_tokens(candidate)
+            if candidate_tokens > max_tokens:
+                break
+            kept.append(sentence)
+            tokens = candidate_tokens
+        if kept:
+            return " ".join(kept), tokens
+
+        # Binary search for the longest word prefix that fits
+        words = text.split()
+        low, high = 0, len(words)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(" ".join(words[:middle])) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        prefix = " ".join(words[:low])
+        return prefix, self.count_tokens(prefix) if prefix else 0
+
+    @staticmethod
+    def _shingles(text: str, size: int = 3) -> Set[tuple]:
+        words = WORD_PATTERN.findall(text.lower())
+        if len(words) < size:
+            return {tuple(words)}
+        return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+    @staticmethod
+    def _jaccard(a: Set[tuple], b: Set[tuple]) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
@@ -0,0 +1,253 @@
+import asyncio
+import codecs
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List
+
+import aiofiles
+
+UPLOAD_BLOCK_SIZE = int(os.getenv("UPLOAD_BLOCK_SIZE", str(1024 * 1024)))
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue cannot accept another job"""
+
+
+async def read_text_blocks(reader, block_size: int = UPLOAD_BLOCK_SIZE):
+    """Read any object with an async read(n) in fixed-size blocks and decode UTF-8 incrementally"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while True:
+        data = await reader.read(block_size)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+class JobStore:
+    """SQLite-backed ingestion job state, so queued work survives a restart"""
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("INGEST_JOBS_DB", "data/jobs.db")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS ingest_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    collection TEXT NOT NULL,
+                    spool_path TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    chunks_processed INTEGER DEFAULT 0,
+                    chunks_skipped INTEGER DEFAULT 0,
+                    chunks_per_sec REAL DEFAULT 0,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            self.conn.commit()
+
+    def create(self, job_id: str, filename: str, collection: str, spool_path: str):
+        now = datetime.now().isoformat()
+        with self.lock:
+            self.conn.execute("""
+                INSERT INTO ingest_jobs (job_id, filename, collection, spool_path, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, 'queued', ?, ?)
+            """, (job_id, filename, collection, spool_path, now, now))
+            self.conn.commit()
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = datetime.now().isoformat()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self.lock:
+            self.conn.execute(f"UPDATE ingest_jobs SET {assignments} WHERE job_id = ?",
+                              (*fields.values(), job_id))
+            self.conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM ingest_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def claim(self, job_id: str) -> bool:
+        """Atomically move a queued job to running; False if another worker already has it"""
+        now = datetime.now().isoformat()
+        with self.lock:
+            cursor = self.conn.execute("""
+                UPDATE ingest_jobs SET status = 'running', updated_at = ?
+                WHERE job_id = ? AND status = 'queued'
+            """, (now, job_id))
+            self.conn.commit()
+        return cursor.rowcount == 1
+
+    def requeue_stale(self, job_id: str, stale_before: str) -> bool:
+        """Put a running job back in the queue if it has made no progress since stale_before"""
+        now = datetime.now().isoformat()
+        with self.lock:
+            cursor = self.conn.execute("""
+                UPDATE ingest_jobs SET status = 'queued', chunks_processed = 0, chunks_skipped = 0,
+                    updated_at = ?
+                WHERE job_id = ? AND status = 'running' AND updated_at < ?
+            """, (now, job_id, stale_before))
+            self.conn.commit()
+        return cursor.rowcount == 1
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT * FROM ingest_jobs WHERE status IN ('queued', 'running') ORDER BY created_at
+            """).fetchall()
+        return [dict(row) for row in rows]
+
+
+class IngestionQueue:
+    """Bounded in-process queue of upload jobs drained by a pool of async workers"""
+
+    def __init__(self, parser, embedder, store: JobStore = None):
+        self.parser = parser
+        self.embedder = embedder
+        self.store = store or JobStore()
+        self.spool_dir = os.getenv("INGEST_SPOOL_DIR", "data/uploads")
+        self.num_workers = int(os.getenv("INGEST_WORKERS", "2"))
+        self.max_queue = int(os.getenv("INGEST_QUEUE_SIZE", "16"))
+        # Running jobs heartbeat every stale_after / 4 seconds; one silent for stale_after is
+        # assumed orphaned by a dead or restarted process and is requeued by the periodic sweep
+        self.stale_after = float(os.getenv("INGEST_JOB_STALE_SECONDS", "120"))
+        self.sweep_interval = float(os.getenv("INGEST_JOB_SWEEP_SECONDS", "30"))
+        self.queue = None
+        self.workers = []
+        self.sweeper = None
+
+    async def start(self):
+        """Start workers, re-enqueue unfinished jobs and keep sweeping for orphaned ones.
+
+        Every server process runs this, so jobs are only taken through atomic claims: a
+        queued job may sit in several processes' queues but runs in exactly one, and a
+        running job is requeued only once its heartbeat has gone stale.
+        """
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.queue = asyncio.Queue()
+        self._recover(startup=True)
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+        self.sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self):
+        tasks = self.workers + ([self.sweeper] if self.sweeper else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        self.sweeper = None
+
+    def _recover(self, startup: bool = False):
+        """Enqueue queued jobs (at startup, or once nobody picked them up) and requeue stale running ones"""
+        stale_before = (datetime.now() - timedelta(seconds=self.stale_after)).isoformat()
+        for job in self.store.unfinished():
+            stale = job["updated_at"] < stale_before
+            if not os.path.exists(job["spool_path"]):
+                if (job["status"] == "queued" and startup) or stale:
+                    self.store.update(job["job_id"], status="failed", error="Upload lost before processing")
+            elif job["status"] == "queued":
+                if startup or stale:
+                    self.queue.put_nowait(job["job_id"])
+            elif self.store.requeue_stale(job["job_id"], stale_before):
+                self.queue.put_nowait(job["job_id"])
+
+    async def _sweep(self):
+        # A quick restart leaves this process's interrupted jobs running but not yet stale at
+        # startup; they are picked up here once their heartbeat runs out
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                self._recover()
+            except Exception as e:
+                print(f"Ingestion job sweep failed: {e}")
+
+    async def submit(self, file, collection_name: str) -> Dict[str, Any]:
+        """Spool an upload to disk and enqueue it; raises QueueFullError when saturated"""
+        if self.queue.qsize() >= self.max_queue:
+            raise QueueFullError(f"Ingestion queue is full ({self.max_queue} jobs pending)")
+
+        job_id = uuid.uuid4().hex
+        spool_path = os.path.join(self.spool_dir, job_id)
+        async with aiofiles.open(spool_path, "wb") as out:
+            while True:
+                data = await file.read(UPLOAD_BLOCK_SIZE)
+                if not data:
+                    break
+                await out.write(data)
+
+        self.store.create(job_id, file.filename, collection_name, spool_path)
+        self.queue.put_nowait(job_id)
+        return self.store.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"Ingestion job {job_id} failed: {e}")
+                self.store.update(job_id, status="failed", error=str(e))
+                self._remove_spool(job_id)
+            finally:
+                self.queue.task_done()
+
+    def _remove_spool(self, job_id: str):
+        job = self.store.get(job_id)
+        if job and os.path.exists(job["spool_path"]):
+            os.remove(job["spool_path"])
+
+    async def _run(self, job_id: str):
+        if not self.store.claim(job_id):
+            # Already taken (or finished) by another worker process
+            return
+        job = self.store.get(job_id)
+        last_update = 0.0
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+
+        def on_progress(progress: Dict[str, Any]):
+            # Throttle writes; the final numbers are stored when the job completes
+            nonlocal last_update
+            now = time.monotonic()
+            if now - last_update >= 1.0:
+                last_update = now
+                self.store.update(job_id, chunks_processed=progress["chunks"],
+                                  chunks_skipped=progress["skipped"],
+                                  chunks_per_sec=progress["chunks_per_sec"])
+
+        try:
+            async with aiofiles.open(job["spool_path"], "rb") as spool:
+                chunks = self.parser.aiter_chunks(
+                    read_text_blocks(spool),
+                    doc_type=job["filename"].split('.')[-1],
+                    source=job["filename"]
+                )
+                stats = await self.embedder.ingest_stream(chunks, job["collection"], on_progress)
+        finally:
+            heartbeat.cancel()
+
+        self.store.update(job_id, status="completed", chunks_processed=stats["chunks"],
+                          chunks_skipped=stats["skipped"], chunks_per_sec=stats["chunks_per_sec"])
+        os.remove(job["spool_path"])
+
+    async def _heartbeat(self, job_id: str):
+        """Keep a running job's updated_at fresh so the sweep never mistakes it for an orphan"""
+        while True:
+            await asyncio.sleep(self.stale_after / 4)
+            self.store.update(job_id)
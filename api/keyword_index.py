@@ -0,0 +1,206 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+
+from api.file_lock import file_lock
+
+# Keeps identifiers like "ERR-1042", "INV/2023/001" or "v2.4.1" together as one token
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+TOKEN_SEPARATORS = re.compile(r"[-_./]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compound identifiers also contribute their parts ("err-1042" -> "err", "1042")"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = TOKEN_SEPARATORS.split(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class InvertedIndex:
+    """BM25-scored inverted index over one collection's chunks.
+
+    Documents are addressed by integer slots; postings map a term to {slot: term frequency}.
+    Deleted slots are recycled, so the index does not grow under re-ingestion churn.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.slot_ids: List[str] = []
+        self.slot_terms: List[Dict[str, int]] = []
+        self.slot_lengths: List[int] = []
+        self.id_to_slot: Dict[str, int] = {}
+        self.free_slots: List[int] = []
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.id_to_slot)
+
+    def add(self, ids: List[str], documents: List[str]):
+        """Index documents; an id that is already present is re-indexed with the new text"""
+        for doc_id, document in zip(ids, documents):
+            if doc_id in self.id_to_slot:
+                self._remove(doc_id)
+            self._insert(doc_id, Counter(tokenize(document)))
+
+    def delete(self, ids: List[str]):
+        for doc_id in ids:
+            if doc_id in self.id_to_slot:
+                self._remove(doc_id)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k (id, BM25 score) pairs for a query"""
+        n_docs = len(self.id_to_slot)
+        if not n_docs:
+            return []
+
+        average_length = self.total_length / n_docs
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for slot, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.slot_lengths[slot] / average_length)
+                scores[slot] = scores.get(slot, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(k, scores.items(), key=lambda x: x[1])
+        return [(self.slot_ids[slot], score) for slot, score in top]
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Only the forward index is stored; postings are rebuilt on load
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "documents": {self.slot_ids[slot]: self.slot_terms[slot] for slot in self.id_to_slot.values()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "InvertedIndex":
+        index = cls(data.get("k1", 1.2), data.get("b", 0.75))
+        for doc_id, terms in data["documents"].items():
+            index._insert(doc_id, terms)
+        return index
+
+    def _insert(self, doc_id: str, terms: Dict[str, int]):
+        length = sum(terms.values())
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.slot_ids[slot] = doc_id
+            self.slot_terms[slot] = terms
+            self.slot_lengths[slot] = length
+        else:
+            slot = len(self.slot_ids)
+            self.slot_ids.append(doc_id)
+            self.slot_terms.append(terms)
+            self.slot_lengths.append(length)
+        self.id_to_slot[doc_id] = slot
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[slot] = tf
+        self.total_length += length
+
+    def _remove(self, doc_id: str):
+        slot = self.id_to_slot.pop(doc_id)
+        terms = self.slot_terms[slot]
+        for term in terms:
+            postings = self.postings[term]
+            del postings[slot]
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.slot_lengths[slot]
+        self.slot_ids[slot] = None
+        self.slot_terms[slot] = {}
+        self.slot_lengths[slot] = 0
+        self.free_slots.append(slot)
+
+
+class KeywordIndex:
+    """Per-collection inverted indexes, persisted as <path>/<collection>.json on flush.
+
+    Several worker processes may index the same collection, so a flush does not write this
+    process's index over the file: it replays the documents added and deleted since the last
+    flush onto the file's current contents under a file lock, then adopts the merged index.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("KEYWORD_INDEX_PATH", "data/keyword_index")
+        self.lock = threading.RLock()
+        self.indexes: Dict[str, InvertedIndex] = {}
+        # collection -> {doc_id: document, or None if deleted} since the last flush
+        self.changes: Dict[str, Dict[str, Optional[str]]] = {}
+
+    def add(self, collection_name: str, ids: List[str], documents: List[str]):
+        with self.lock:
+            self._index(collection_name).add(ids, documents)
+            self.changes.setdefault(collection_name, {}).update(zip(ids, documents))
+
+    def delete(self, collection_name: str, ids: List[str]):
+        with self.lock:
+            self._index(collection_name).delete(ids)
+            self.changes.setdefault(collection_name, {}).update(dict.fromkeys(ids))
+
+    def search(self, collection_name: str, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        with self.lock:
+            return self._index(collection_name).search(query, k)
+
+    def count(self, collection_name: str) -> int:
+        with self.lock:
+            return len(self._index(collection_name))
+
+    def flush(self, collection_name: str):
+        with self.lock:
+            changes = self.changes.pop(collection_name, None)
+            if not changes:
+                return
+            file_path = self._file_path(collection_name)
+            with file_lock(file_path):
+                index = self._read(file_path)
+                for doc_id, document in changes.items():
+                    if document is None:
+                        index.delete([doc_id])
+                    else:
+                        index.add([doc_id], [document])
+                tmp_path = file_path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(index.to_dict(), f)
+                os.replace(tmp_path, file_path)
+            # Now also includes what other workers flushed
+            self.indexes[collection_name] = index
+
+    def _index(self, collection_name: str) -> InvertedIndex:
+        index = self.indexes.get(collection_name)
+        if index is None:
+            index = self.indexes[collection_name] = self._read(self._file_path(collection_name))
+        return index
+
+    def _file_path(self, collection_name: str) -> str:
+        return os.path.join(self.path, f"{collection_name}.json")
+
+    @staticmethod
+    def _read(file_path: str) -> InvertedIndex:
+        if not os.path.exists(file_path):
+            return InvertedIndex()
+        with open(file_path) as f:
+            return InvertedIndex.from_dict(json.load(f))
+
+
+_keyword_index = None
+
+
+def get_keyword_index() -> KeywordIndex:
+    """Process-wide keyword index shared by ingestion and retrieval"""
+    global _keyword_index
+    if _keyword_index is None:
+        _keyword_index = KeywordIndex()
+    return _keyword_index
@@ -1,136 +1,33 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Query, Body
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi import Request
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
 import uvicorn
+import asyncio
+import codecs
+import json
+import logging
 import os
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional, List
 
+logger = logging.getLogger(__name__)
 
-@app.get("/api/quick-questions")
-async def get_quick_questions():
-    """
-    Get frequently asked questions or common queries
-    """
-    try:
-        # We can make this dynamic by analyzing your actual data
-        # For now, returning static questions that work for most knowledge bases
-        common_questions = [
-            "What are the most common issues reported?",
-            "How do I reset passwords?",
-            "What is the refund policy?",
-            "How to troubleshoot connectivity problems?",
-            "Where can I find user documentation?",
-            "What are the system requirements?",
-            "How to contact customer support?",
-            "What's new in the latest update?",
-            "How to backup and restore data?",
-            "How to improve system performance?"
-        ]
-        
-        return {
-            "success": True,
-            "questions": common_questions
-        }
-        
-    except Exception as e:
-        logger.error(f"Quick questions error: {str(e)}")
-        return {
-            "success": False,
-            "questions": [],
-            "error": str(e)
-        }
-
-# Update of existing search endpoint or add a new one
-@app.post("/api/search")
-async def search_queries(
-    query: str = Body(..., embed=True),
-    category_filter: Optional[str] = Body(None),
-    date_filter: Optional[str] = Body(None),
-    limit: int = Body(10)
-):
-    """
-    Search queries with filtering options
-    """
-    try:
-        # Build filter criteria
-        filter_criteria = {}
-        
-        if category_filter and category_filter != "all":
-            filter_criteria["category"] = category_filter
-            
-        if date_filter and date_filter != "all":
-            # Handle different date filter options
-            if date_filter == "today":
-                start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-                filter_criteria["date_from"] = start_date
-            elif date_filter == "week":
-                start_date = datetime.now() - timedelta(days=7)
-                filter_criteria["date_from"] = start_date
-            elif date_filter == "month":
-                start_date = datetime.now() - timedelta(days=30)
-                filter_criteria["date_from"] = start_date
-            # Add more date filters as needed
-        
-        <!-- In your results section, make sure you have: -->
-<div id="resultsContainer">
-    <!-- Results info and results will be inserted here by JavaScript -->
-</div>
-        results = await rag_engine.search(
-            query=query,
-            filter_criteria=filter_criteria,
-            limit=limit
-        )
-        
-        return {
-            "success": True,
-            "results": results,
-            "query": query,
-            "filters": {
-                "category": category_filter,
-                "date": date_filter
-            }
-        }
-        
-    except Exception as e:
-        logger.error(f"Search error: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e),
-            "results": []
-        }
-
-@app.get("/api/categories")
-async def get_categories():
-    """
-    Get available categories for filtering
-    """
-    try:
-        # This should query your database for distinct categories
-        categories = await ticket_manager.get_categories()
-        return {
-            "success": True,
-            "categories": categories
-        }
-    except Exception as e:
-        logger.error(f"Categories error: {str(e)}")
-        return {
-            "success": False,
-            "categories": [],
-            "error": str(e)
-        }
 
 # Add the project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from api.rag_engine import RAGEngine
+from api.rag_engine import RAGEngine, build_where
 from api.ticket_manager import TicketManager
+from api.ingest_jobs import IngestionQueue, QueueFullError
+from api.redaction import get_redactor
+from api.semantic_cache import get_semantic_cache
 from models.triage_classifier.classifier import TriageClassifier
 from models.prompts.answer_generator import AnswerGenerator
 from ingestion.parser import DocumentParser
@@ -138,6 +35,23 @@ from ingestion.embedder import EmbeddingGenerator
 
 app = FastAPI(title="ConvoSearch API", version="1.0.0")
 
+TRIAGE_BATCH_SIZE = int(os.getenv("TRIAGE_BATCH_SIZE", "64"))
+
+# Static questions that work for most knowledge bases; answers are pre-warmed into the
+# semantic answer cache at startup (SEMANTIC_CACHE_PREWARM=false to skip)
+QUICK_QUESTIONS = [
+    "What are the most common issues reported?",
+    "How do I reset passwords?",
+    "What is the refund policy?",
+    "How to troubleshoot connectivity problems?",
+    "Where can I find user documentation?",
+    "What are the system requirements?",
+    "How to contact customer support?",
+    "What's new in the latest update?",
+    "How to backup and restore data?",
+    "How to improve system performance?"
+]
+
 # Mount static files and templates
 app.mount("/static", StaticFiles(directory="webui/static"), name="static")
 templates = Jinja2Templates(directory="webui/templates")
@@ -155,28 +69,57 @@ app.add_middleware(
 rag_engine = RAGEngine()
 ticket_manager = TicketManager()
 triage_classifier = TriageClassifier()
-answer_generator = AnswerGenerator()
+semantic_cache = get_semantic_cache()
+answer_generator = AnswerGenerator(answer_cache=semantic_cache)
+redactor = get_redactor()
 document_parser = DocumentParser()
 embedding_generator = EmbeddingGenerator()
+ingestion_queue = IngestionQueue(document_parser, embedding_generator)
 
 
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
-    ticket_manager.init_db()
+    await run_in_threadpool(ticket_manager.init_db)
+    await ingestion_queue.start()
+    if os.getenv("SEMANTIC_CACHE_PREWARM", "true").lower() != "false":
+        app.state.prewarm_task = asyncio.create_task(prewarm_answer_cache())
     print("ConvoSearch API started successfully!")
 
 
+async def prewarm_answer_cache():
+    """Answer the quick questions once so clicking one is served from the answer cache"""
+    for question in QUICK_QUESTIONS:
+        try:
+            retrieval = await rag_engine.retrieve_async(question, ["faq", "tickets"])
+            embedding, context_ids = await answer_cache_key(question, retrieval)
+            await answer_generator.generate_answer(question, retrieval["context"], embedding, context_ids)
+        except Exception as e:
+            print(f"Failed to pre-warm answer for '{question}': {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await ingestion_queue.stop()
+    await answer_generator.close()
+
+
 # Request/Response models
 class QueryRequest(BaseModel):
     question: str
     collection: str = "faq"
+    # Same filters as /api/search; "all" or unset means unfiltered
+    category_filter: Optional[str] = None
+    date_filter: Optional[str] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
 
 
 class QueryResponse(BaseModel):
     answer: str
     sources: List[str]
     confidence: float
+    context_tokens: Optional[int] = None  # prompt tokens spent on retrieved context
 
 
 class TriageRequest(BaseModel):
@@ -201,10 +144,33 @@ class TicketCreateResponse(BaseModel):
     status: str
 
 
+class TicketBulkCreateRequest(BaseModel):
+    tickets: List[TicketCreateRequest]
+
+
+class TicketBulkCreateResponse(BaseModel):
+    ticket_ids: List[str]
+    count: int
+
+
 class UploadResponse(BaseModel):
     filename: str
     status: str
     chunks_processed: int
+    job_id: Optional[str] = None
+
+
+class UploadJobStatus(BaseModel):
+    job_id: str
+    filename: str
+    collection: str
+    status: str  # "queued", "running", "completed", "failed"
+    chunks_processed: int
+    chunks_skipped: int
+    chunks_per_sec: float
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
 
 
 # Web UI Routes
@@ -229,41 +195,205 @@ async def health_check():
     return {"status": "healthy", "service": "ConvoSearch API"}
 
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the query embedding, results and semantic answer caches"""
+    stats = rag_engine.cache.stats()
+    stats["answers"] = semantic_cache.stats()
+    return stats
+
+
+def build_filter_criteria(category_filter: Optional[str], date_filter: Optional[str],
+                          start_date: Optional[datetime], end_date: Optional[datetime]) -> Dict[str, Any]:
+    """Filter criteria from the UI's category and date filter fields"""
+    filter_criteria = {}
+
+    if category_filter and category_filter != "all":
+        filter_criteria["category"] = category_filter
+
+    if date_filter and date_filter != "all":
+        # Handle different date filter options
+        if date_filter == "today":
+            start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            filter_criteria["date_from"] = start
+        elif date_filter == "week":
+            filter_criteria["date_from"] = datetime.now() - timedelta(days=7)
+        elif date_filter == "month":
+            filter_criteria["date_from"] = datetime.now() - timedelta(days=30)
+        elif date_filter == "custom":
+            if start_date:
+                filter_criteria["date_from"] = start_date
+            if end_date:
+                # Inclusive of the whole end day
+                filter_criteria["date_to"] = end_date + timedelta(days=1)
+
+    return filter_criteria
+
+
+def query_where(request: QueryRequest) -> Optional[Dict[str, Any]]:
+    """Metadata filter for a query request, or None when it has no filters"""
+    return build_where(build_filter_criteria(
+        request.category_filter, request.date_filter, request.start_date, request.end_date
+    ))
+
+
+async def answer_cache_key(question: str, retrieval: Dict[str, Any]):
+    """Query embedding and context chunk ids for the semantic answer cache; (None, None) bypasses it"""
+    if retrieval["partial"]:
+        # Context is missing timed-out collections; don't pin this answer in the cache
+        return None, None
+    embedding = await rag_engine.embed_query_async(question)
+    return embedding, [source.get("id") for source in retrieval["sources"]]
+
+
 @app.post("/api/query", response_model=QueryResponse)
 async def query_knowledge_base(request: QueryRequest):
     """Query the knowledge base for answers"""
     try:
-        # Get relevant context from RAG engine
-        context = rag_engine.get_relevant_context(request.question)
+        question = redactor.redact(request.question)
+
+        # Single retrieval pass: context and source information come from the same query
+        retrieval = await rag_engine.retrieve_async(question, ["faq", "tickets", request.collection],
+                                                    where=query_where(request))
 
-        # Generate answer using the context
-        answer = answer_generator.generate_answer(request.question, context)
+        # Generate answer using the context, reusing a cached answer for near-duplicate questions
+        embedding, context_ids = await answer_cache_key(question, retrieval)
+        answer = await answer_generator.generate_answer(question, retrieval["context"], embedding, context_ids)
 
         # Get source information
-        rag_results = rag_engine.query(request.question, request.collection)
+        rag_results = retrieval["collections"][request.collection]
         sources = [source["source"] for source in rag_results["sources"][:2]]  # Top 2 sources
 
         return QueryResponse(
             answer=answer,
             sources=sources if sources else ["general_knowledge"],
-            confidence=rag_results["average_confidence"]
+            confidence=rag_results["average_confidence"],
+            context_tokens=retrieval["context_tokens"]
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def query_events(request: QueryRequest):
+    """Sources first, then answer tokens as the generator yields them, then a closing event"""
+    try:
+        question = redactor.redact(request.question)
+        retrieval = await rag_engine.retrieve_async(question, ["faq", "tickets", request.collection],
+                                                    where=query_where(request))
+
+        rag_results = retrieval["collections"][request.collection]
+        sources = [source["source"] for source in rag_results["sources"][:2]]  # Top 2 sources
+        yield sse_event("sources", {
+            "sources": sources if sources else ["general_knowledge"],
+            "confidence": rag_results["average_confidence"],
+            "partial": retrieval["partial"],
+            "context_tokens": retrieval["context_tokens"]
+        })
+
+        embedding, context_ids = await answer_cache_key(question, retrieval)
+        answer = []
+        async for token in answer_generator.stream_answer(question, retrieval["context"], embedding, context_ids):
+            answer.append(token)
+            yield sse_event("token", {"text": token})
+
+        yield sse_event("done", {"answer": "".join(answer)})
+    except Exception as e:
+        # Headers are already sent; report the failure as an event
+        yield sse_event("error", {"detail": f"Query failed: {str(e)}"})
+
+
+@app.post("/api/query/stream")
+async def query_knowledge_base_stream(request: QueryRequest):
+    """Query the knowledge base, streaming the answer as Server-Sent Events"""
+    return StreamingResponse(
+        query_events(request),
+        media_type="text/event-stream",
+        # Proxies must pass events through as they are written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/quick-questions")
+async def get_quick_questions():
+    """
+    Get frequently asked questions or common queries
+    """
+    try:
+        # We can make this dynamic by analyzing your actual data
+        return {
+            "success": True,
+            "questions": QUICK_QUESTIONS
+        }
+        
+    except Exception as e:
+        logger.error(f"Quick questions error: {str(e)}")
+        return {
+            "success": False,
+            "questions": [],
+            "error": str(e)
+        }
+
+
+@app.post("/api/search")
+async def search_queries(
+    query: str = Body(..., embed=True),
+    category_filter: Optional[str] = Body(None),
+    date_filter: Optional[str] = Body(None),
+    start_date: Optional[datetime] = Body(None),
+    end_date: Optional[datetime] = Body(None),
+    limit: int = Body(10)
+):
+    """
+    Search queries with filtering options
+    """
+    try:
+        filter_criteria = build_filter_criteria(category_filter, date_filter, start_date, end_date)
+
+        results = await rag_engine.search(
+            query=query,
+            filter_criteria=filter_criteria,
+            limit=limit
+        )
+        
+        return {
+            "success": True,
+            "results": results,
+            "query": query,
+            "filters": {
+                "category": category_filter,
+                "date": date_filter
+            }
+        }
+        
+    except Exception as e:
+        logger.error(f"Search error: {str(e)}")
+        return {
+            "success": False,
+            "error": str(e),
+            "results": []
+        }
+
+
 @app.post("/api/triage", response_model=TriageResponse)
 async def triage_message(request: TriageRequest):
     """Classify and triage incoming customer message"""
     try:
+        # PII is masked before the message reaches the classifier, retrieval or the prompt
+        message = redactor.redact(request.message)
+
         # Classify the message
-        classification_result = triage_classifier.classify(request.message)
+        classification_result = triage_classifier.classify(message)
 
         # Get relevant context for suggested reply
-        context = rag_engine.get_relevant_context(request.message, ["faq", "tickets"])
+        retrieval = await rag_engine.retrieve_async(message, ["faq", "tickets"])
 
         # Generate suggested reply
-        suggested_reply = answer_generator.generate_suggested_reply(request.message, context)
+        suggested_reply = await answer_generator.generate_suggested_reply(message, retrieval["context"])
 
         return TriageResponse(
             classification=classification_result["classification"],
@@ -275,11 +405,84 @@ async def triage_message(request: TriageRequest):
         raise HTTPException(status_code=500, detail=f"Triage failed: {str(e)}")
 
 
+async def iter_triage_messages(request: Request):
+    """Yield messages from a JSON list / {"messages": [...]} body or an NDJSON stream"""
+    if "ndjson" in request.headers.get("content-type", ""):
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        buffer = ""
+        async for block in request.stream():
+            buffer += decoder.decode(block)
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                if line.strip():
+                    yield parse_triage_item(json.loads(line))
+        buffer += decoder.decode(b"", final=True)
+        if buffer.strip():
+            yield parse_triage_item(json.loads(buffer))
+    else:
+        body = await request.json()
+        for item in body["messages"] if isinstance(body, dict) else body:
+            yield parse_triage_item(item)
+
+
+def parse_triage_item(item) -> str:
+    return item if isinstance(item, str) else TriageRequest(**item).message
+
+
+async def triage_batch_results(messages):
+    """Triage messages in batches, yielding one NDJSON line per message as each batch finishes"""
+    index = 0
+    batch = []
+
+    async def process(batch, offset):
+        batch = redactor.redact_batch(batch)
+        classifications = triage_classifier.classify_batch(batch)
+        retrievals = await rag_engine.retrieve_batch(batch, ["faq", "tickets"])
+        # Issued together so the LLM client can micro-batch them
+        replies = await asyncio.gather(*(
+            answer_generator.generate_suggested_reply(message, retrieval["context"])
+            for message, retrieval in zip(batch, retrievals)
+        ))
+        lines = []
+        for i, (classification_result, suggested_reply) in enumerate(zip(classifications, replies)):
+            result = TriageResponse(
+                classification=classification_result["classification"],
+                confidence=classification_result["confidence"],
+                suggested_reply=suggested_reply,
+                sources=[f"{classification_result['classification']}_category"]
+            )
+            lines.append(json.dumps({"index": offset + i, **result.model_dump()}) + "\n")
+        return "".join(lines)
+
+    try:
+        async for message in messages:
+            batch.append(message)
+            if len(batch) >= TRIAGE_BATCH_SIZE:
+                yield await process(batch, index)
+                index += len(batch)
+                batch = []
+        if batch:
+            yield await process(batch, index)
+    except Exception as e:
+        # Headers are already sent; report the failure in-band as the last line
+        yield json.dumps({"error": f"Triage failed: {str(e)}"}) + "\n"
+
+
+@app.post("/api/triage/batch")
+async def triage_batch(request: Request):
+    """Triage a backlog of messages; results stream back as NDJSON in input order"""
+    return StreamingResponse(
+        triage_batch_results(iter_triage_messages(request)),
+        media_type="application/x-ndjson"
+    )
+
+
 @app.post("/api/tickets", response_model=TicketCreateResponse)
 async def create_ticket(request: TicketCreateRequest):
     """Create a new support ticket"""
     try:
-        result = ticket_manager.create_ticket(
+        result = await run_in_threadpool(
+            ticket_manager.create_ticket,
             request.customer_message,
             request.classification,
             request.suggested_reply
@@ -293,54 +496,90 @@ async def create_ticket(request: TicketCreateRequest):
         raise HTTPException(status_code=500, detail=f"Ticket creation failed: {str(e)}")
 
 
-@app.post("/api/upload")
-async def upload_document(file: UploadFile = File(...)):
-    """Upload and process a document"""
+@app.post("/api/tickets/bulk", response_model=TicketBulkCreateResponse)
+async def create_tickets_bulk(request: TicketBulkCreateRequest):
+    """Create many tickets in one transaction (historical imports, batch triage)"""
+    try:
+        ticket_ids = await run_in_threadpool(
+            ticket_manager.create_tickets_bulk,
+            [ticket.model_dump() for ticket in request.tickets]
+        )
+
+        return TicketBulkCreateResponse(ticket_ids=ticket_ids, count=len(ticket_ids))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bulk ticket creation failed: {str(e)}")
+
+
+@app.get("/api/categories")
+async def get_categories():
+    """
+    Get available categories (with ticket counts) for filtering
+    """
     try:
-        # Read file content
-        content = await file.read()
-        text_content = content.decode('utf-8')
+        # Served from the maintained per-category counts, never a DISTINCT scan
+        categories = await run_in_threadpool(ticket_manager.get_categories)
+        return {
+            "success": True,
+            "categories": categories
+        }
+    except Exception as e:
+        logger.error(f"Categories error: {str(e)}")
+        return {
+            "success": False,
+            "categories": [],
+            "error": str(e)
+        }
 
-        # Parse document into chunks
-        chunks = document_parser.parse_text(text_content, doc_type=file.filename.split('.')[-1])
 
-        # Generate embeddings and store in vector DB
-        await embedding_generator.generate_embeddings(chunks, collection_name="uploaded_docs")
+@app.post("/api/upload", response_model=UploadResponse, status_code=202)
+async def upload_document(file: UploadFile = File(...)):
+    """Accept a document for background ingestion"""
+    try:
+        job = await ingestion_queue.submit(file, collection_name="uploaded_docs")
 
         return UploadResponse(
             filename=file.filename,
-            status="processed",
-            chunks_processed=len(chunks)
+            status=job["status"],
+            chunks_processed=0,
+            job_id=job["job_id"]
         )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
+@app.get("/api/upload/{job_id}", response_model=UploadJobStatus)
+async def upload_status(job_id: str):
+    """Report progress of a background ingestion job"""
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown upload job: {job_id}")
+    return UploadJobStatus(**job)
+
+
 @app.get("/api/tickets")
-async def list_tickets():
-    """List all tickets (for demo purposes)"""
+async def list_tickets(
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    classification: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None
+):
+    """List tickets newest first; pass next_cursor back as cursor for the next page"""
     try:
-        conn = ticket_manager.get_connection()
-        cur = conn.cursor()
-
-        cur.execute("""
-            SELECT ticket_id, customer_message, classification, suggested_reply, status, created_at
-            FROM tickets ORDER BY created_at DESC LIMIT 10
-        """)
-
-        tickets = []
-        for row in cur.fetchall():
-            tickets.append({
-                "ticket_id": row[0],
-                "customer_message": row[1],
-                "classification": row[2],
-                "suggested_reply": row[3],
-                "status": row[4],
-                "created_at": row[5].isoformat() if row[5] else None
-            })
-
-        cur.close()
-        return {"tickets": tickets}
+        return await run_in_threadpool(
+            ticket_manager.list_tickets,
+            limit=limit,
+            cursor=cursor,
+            status=status,
+            classification=classification,
+            date_from=date_from,
+            date_to=date_to
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch tickets: {str(e)}")
 
@@ -1,102 +1,354 @@
-import chromadb
-from chromadb.config import Settings
+import asyncio
 import os
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from api.cache import get_query_cache
+from api.calibration import get_calibrator, similarity_to_distance
+from api.context_packer import ContextPacker
+from api.keyword_index import get_keyword_index
+from api.vector_store import get_vector_store, get_embedding_function
 
 
 class RAGEngine:
     def __init__(self):
-        self.client = chromadb.HttpClient(
-            host=os.getenv("CHROMA_HOST", "localhost"),
-            port=os.getenv("CHROMA_PORT", "8001")
+        self.store = get_vector_store()
+        # Blocking Chroma calls run here so async handlers keep the event loop free
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("RAG_MAX_WORKERS", "8")),
+            thread_name_prefix="rag-query"
         )
+        self.query_timeout = float(os.getenv("RAG_QUERY_TIMEOUT", "5.0"))
+        # Same embedding function used at ingest, so cached vectors are interchangeable
+        self.embedding_function = get_embedding_function()
+        self.cache = get_query_cache()
+        self.calibrator = get_calibrator()
+        self.metrics = {}
+        # Sources below this calibrated confidence are not sent to the answer generator
+        self.min_confidence = float(os.getenv("RAG_MIN_CONFIDENCE", "0.0"))
+        self.context_packer = ContextPacker()
+        # Share of the reciprocal-rank-fusion score given to BM25 hits; 0 disables hybrid retrieval
+        self.keyword_index = get_keyword_index()
+        self.hybrid_weight = float(os.getenv("HYBRID_WEIGHT", "0.5"))
+        self.rrf_k = int(os.getenv("HYBRID_RRF_K", "60"))
+
+    def embed_query(self, question: str) -> List[float]:
+        """Embed a query, reusing the cached vector for repeated questions"""
+        return self.embed_queries([question])[0]
+
+    def embed_queries(self, questions: List[str]) -> List[List[float]]:
+        """Embed several queries, computing all cache misses in one model call"""
+        embeddings = [self.cache.get_embedding(question) for question in questions]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            texts = list(dict.fromkeys(questions[i] for i in missing))
+            computed = {text: list(e) for text, e in zip(texts, self.embedding_function(texts))}
+            for text, embedding in computed.items():
+                self.cache.set_embedding(text, embedding)
+            for i in missing:
+                embeddings[i] = computed[questions[i]]
+        return embeddings
 
-    def query(self, question: str, collection_name: str = "faq", n_results: int = 3) -> Dict[str, Any]:
+    async def embed_query_async(self, question: str) -> List[float]:
+        """embed_query off the event loop (normally a cache hit right after retrieval)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.embed_query, question)
+
+    def query(self, question: str, collection_name: str = "faq", n_results: int = 3,
+              where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Query the vector database for relevant documents"""
+        return self.query_batch([question], collection_name, n_results, where)[0]
+
+    def query_batch(self, questions: List[str], collection_name: str = "faq", n_results: int = 3,
+                    where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Query one collection for several questions with a single vector-store call"""
+        # Filtered queries are ad hoc; only unfiltered results go through the results cache
+        if where:
+            responses = [None] * len(questions)
+        else:
+            responses = [self.cache.get_results(question, collection_name, n_results) for question in questions]
+        missing = [i for i, response in enumerate(responses) if response is None]
+        if not missing:
+            return responses
+
         try:
-            collection = self.client.get_collection(collection_name)
+            embeddings = self.embed_queries([questions[i] for i in missing])
+            results = self.store.query(collection_name, embeddings, n_results=n_results, where=where)
 
-            results = collection.query(
-                query_texts=[question],
-                n_results=n_results,
-                include=["documents", "metadatas", "distances"]
-            )
+            for row, i in enumerate(missing):
+                responses[i] = self._format_results(results, row, collection_name)
+                if not where and self.hybrid_weight > 0:
+                    # The keyword index has no metadata, so filtered queries stay vector-only
+                    responses[i] = self._fuse_keyword_hits(questions[i], embeddings[row], collection_name,
+                                                           n_results, responses[i])
+                if not where:
+                    self.cache.set_results(questions[i], collection_name, n_results, responses[i])
+            return responses
+
+        except Exception as e:
+            print(f"Error querying vector database: {e}")
+            return [response or {"sources": [], "average_confidence": 0.0} for response in responses]
+
+    def _format_results(self, results: Dict[str, Any], row: int, collection_name: str) -> Dict[str, Any]:
+        """Convert one query's row of a vector-store response into sources with calibrated confidences"""
+        ids = results["ids"][row] if results.get("ids") else []
+        documents = results["documents"][row] if results["documents"] else []
+        metadatas = results["metadatas"][row] if results["metadatas"] else []
+        distances = results["distances"][row] if results["distances"] else []
+
+        metric = self._distance_metric(collection_name)
+        confidences = [self.calibrator.confidence(collection_name, distance, metric) for distance in distances]
+
+        sources = []
+        for i, (doc, metadata) in enumerate(zip(documents, metadatas)):
+            sources.append({
+                "id": ids[i] if i < len(ids) else None,
+                "content": doc,
+                "source": metadata.get("source", "unknown"),
+                "metadata": metadata,
+                "confidence": confidences[i] if i < len(confidences) else 0.5
+            })
+
+        return {
+            "sources": sources,
+            "average_confidence": sum(confidences) / len(confidences) if confidences else 0.5
+        }
+
+    def _distance_metric(self, collection_name: str) -> str:
+        metric = self.metrics.get(collection_name)
+        if metric is None:
+            metric = self.metrics[collection_name] = self.store.distance_metric(collection_name)
+        return metric
 
-            # Convert distances to confidence scores
-            documents = results["documents"][0] if results["documents"] else []
-            metadatas = results["metadatas"][0] if results["metadatas"] else []
-            distances = results["distances"][0] if results["distances"] else []
-
-            # Calculate confidence (inverse of distance, normalized)
-            confidences = []
-            for distance in distances:
-                if distance is not None:
-                    confidence = max(0, 1 - distance)  # Simple conversion
-                    confidences.append(confidence)
-                else:
-                    confidences.append(0.5)
-
-            sources = []
-            for i, (doc, metadata) in enumerate(zip(documents, metadatas)):
-                sources.append({
+    def _fuse_keyword_hits(self, question: str, embedding: List[float], collection_name: str, n_results: int,
+                           response: Dict[str, Any]) -> Dict[str, Any]:
+        """Reciprocal rank fusion of the vector results with BM25 hits from the keyword index.
+
+        Each source's "score" is the weighted sum of 1 / (rrf_k + rank) over both lists and
+        orders the sources within this collection. Keyword-only hits are fetched from the
+        store with their embeddings, so their confidence is calibrated like any vector hit.
+        """
+        weight = self.hybrid_weight
+        fused = {}
+        for rank, source in enumerate(response["sources"], 1):
+            fused[source["id"]] = dict(source, score=(1 - weight) / (self.rrf_k + rank))
+
+        hits = self.keyword_index.search(collection_name, question, n_results)
+        keyword_only = [doc_id for doc_id, _ in hits if doc_id not in fused]
+        if keyword_only:
+            stored = self.store.get(collection_name, keyword_only, include_embeddings=True)
+            metric = self._distance_metric(collection_name)
+            query = np.asarray(embedding, dtype=np.float32)
+            query /= np.linalg.norm(query) or 1.0
+            for doc_id, doc, metadata, doc_embedding in zip(stored["ids"], stored["documents"],
+                                                            stored["metadatas"], stored["embeddings"]):
+                vector = np.asarray(doc_embedding, dtype=np.float32)
+                similarity = float(vector @ query) / (float(np.linalg.norm(vector)) or 1.0)
+                fused[doc_id] = {
+                    "id": doc_id,
                     "content": doc,
                     "source": metadata.get("source", "unknown"),
-                    "confidence": confidences[i] if i < len(confidences) else 0.5
-                })
+                    "metadata": metadata,
+                    "confidence": self.calibrator.confidence(
+                        collection_name, similarity_to_distance(similarity, metric), metric
+                    ),
+                    "score": 0.0
+                }
+        for rank, (doc_id, _) in enumerate(hits, 1):
+            if doc_id in fused:
+                fused[doc_id]["score"] += weight / (self.rrf_k + rank)
 
-            return {
-                "sources": sources,
-                "average_confidence": sum(confidences) / len(confidences) if confidences else 0.5
-            }
+        sources = sorted(fused.values(), key=lambda x: x["score"], reverse=True)[:n_results]
+        return dict(response, sources=sources)
 
-        except Exception as e:
-            print(f"Error querying vector database: {e}")
-            return {"sources": [], "average_confidence": 0.0}
+    def retrieve(self, question: str, collections: List[str] = None, top_k: int = None) -> Dict[str, Any]:
+        """Query each collection once and return context, sources and confidence together"""
+        if collections is None:
+            collections = ["faq", "tickets"]
+
+        n_results = self._candidate_count(top_k)
+        results = {}
+        for collection in collections:
+            if collection not in results:
+                results[collection] = self.query(question, collection, n_results)
+
+        return self._merge_results(results, top_k)
+
+    async def retrieve_async(self, question: str, collections: List[str] = None, top_k: int = None,
+                             timeout: float = None, where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Query all collections concurrently; collections slower than the timeout are skipped.
+
+        `where` is a metadata filter (see build_where) applied inside every collection's query.
+        """
+        if collections is None:
+            collections = ["faq", "tickets"]
+        if timeout is None:
+            timeout = self.query_timeout
+
+        names = list(dict.fromkeys(collections))
+        n_results = self._candidate_count(top_k)
+        loop = asyncio.get_running_loop()
+        tasks = [
+            asyncio.wait_for(
+                loop.run_in_executor(self.executor, self.query, question, name, n_results, where), timeout
+            )
+            for name in names
+        ]
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = {}
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                print(f"Query on collection '{name}' timed out after {timeout}s")
+                results[name] = {"sources": [], "average_confidence": 0.0, "timed_out": True}
+            elif isinstance(outcome, Exception):
+                print(f"Query on collection '{name}' failed: {outcome}")
+                results[name] = {"sources": [], "average_confidence": 0.0}
+            else:
+                results[name] = outcome
+
+        return self._merge_results(results, top_k)
+
+    async def retrieve_batch(self, questions: List[str], collections: List[str] = None, top_k: int = None,
+                             timeout: float = None) -> List[Dict[str, Any]]:
+        """Retrieve context for many questions with one batched query per collection"""
+        if collections is None:
+            collections = ["faq", "tickets"]
+        if timeout is None:
+            timeout = self.query_timeout
+
+        names = list(dict.fromkeys(collections))
+        n_results = self._candidate_count(top_k)
+        loop = asyncio.get_running_loop()
+        tasks = [
+            asyncio.wait_for(
+                loop.run_in_executor(self.executor, self.query_batch, questions, name, n_results), timeout
+            )
+            for name in names
+        ]
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+
+        per_question = [{} for _ in questions]
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Batch query on collection '{name}' failed: {outcome!r}")
+                timed_out = isinstance(outcome, asyncio.TimeoutError)
+                outcome = [{"sources": [], "average_confidence": 0.0, "timed_out": timed_out}] * len(questions)
+            for results, response in zip(per_question, outcome):
+                results[name] = response
+
+        return [self._merge_results(results, top_k) for results in per_question]
+
+    def _candidate_count(self, top_k: Optional[int]) -> int:
+        """Hits to fetch per collection: enough to fill top_k, or every source the packer may use"""
+        return top_k if top_k is not None else self.context_packer.max_candidates
+
+    def _merge_results(self, results: Dict[str, Dict[str, Any]], top_k: int = None) -> Dict[str, Any]:
+        """Merge per-collection results and pick the context.
+
+        Collections are interleaved by calibrated confidence (see merge_by_confidence). By
+        default the context is packed into the CONTEXT_TOKEN_BUDGET in that order; an
+        explicit `top_k` keeps exactly the top_k sources instead.
+        """
+        ranked = [
+            s for s in merge_by_confidence([r["sources"] for r in results.values()])
+            if s["confidence"] >= self.min_confidence
+        ]
+
+        if top_k is None:
+            packed = self.context_packer.pack(ranked)
+            top_sources = packed["sources"]
+            context_tokens = packed["tokens_used"]
+        else:
+            top_sources = ranked[:top_k]
+            context_tokens = sum(self.context_packer.count_tokens(s["content"]) for s in top_sources)
+
+        return {
+            "context": [source["content"] for source in top_sources],
+            "sources": top_sources,
+            "context_tokens": context_tokens,
+            "collections": results,
+            "partial": any(r.get("timed_out") for r in results.values())
+        }
 
     def get_relevant_context(self, question: str, collections: List[str] = None) -> List[str]:
         """Get relevant context from multiple collections"""
+        return self.retrieve(question, collections)["context"]
+
+    async def search(self, query: str, filter_criteria: Optional[Dict[str, Any]] = None, limit: int = 10,
+                     collections: List[str] = None) -> List[Dict[str, Any]]:
+        """Filtered search across collections.
+
+        Filters are pushed down into the vector query (`where=`), so every collection
+        returns its best `limit` matches among documents that pass the filter; the merged
+        list is then cut back to `limit` overall.
+        """
         if collections is None:
-            collections = ["faq", "tickets"]
+            collections = ["faq", "tickets", "uploaded_docs"]
 
-        all_sources = []
-        for collection in collections:
-            results = self.query(question, collection)
-            all_sources.extend(results["sources"])
-
-        # Sort by confidence and return top 3
-        all_sources.sort(key=lambda x: x["confidence"], reverse=True)
-        return [source["content"] for source in all_sources[:3]]
-
-        async def search(
-    self, 
-    query: str, 
-    filter_criteria: Optional[dict] = None,
-    limit: int = 10
-):
-    """
-    Enhanced search with filtering
+        where = build_where(filter_criteria or {})
+        loop = asyncio.get_running_loop()
+        tasks = [
+            asyncio.wait_for(
+                loop.run_in_executor(self.executor, self.query_batch, [query], name, limit, where),
+                self.query_timeout
+            )
+            for name in collections
+        ]
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = []
+        for name, outcome in zip(collections, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Search on collection '{name}' failed: {outcome!r}")
+                continue
+            for source in outcome[0]["sources"]:
+                metadata = source.get("metadata", {})
+                results.append({
+                    "content": source["content"],
+                    "source": source["source"],
+                    "collection": name,
+                    "category": metadata.get("category"),
+                    "timestamp": metadata.get("timestamp"),
+                    "confidence": source["confidence"]
+                })
+
+        results.sort(key=lambda x: x["confidence"], reverse=True)
+        return results[:limit]
+
+
+def merge_by_confidence(source_lists: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Interleave per-collection rankings, always taking the head with the highest calibrated confidence.
+
+    Each list keeps its own order (fused RRF rank within a collection); raw RRF scores are
+    never compared across collections, since they only reflect rank, not relevance.
     """
-    try:
-        # Your existing embedding and search logic
-        query_embedding = await self.embedder.embed_query(query)
-        
-        # Apply filters to your vector search
-        search_filters = {}
-        if filter_criteria:
-            if "category" in filter_criteria:
-                search_filters["category"] = filter_criteria["category"]
-            if "date_from" in filter_criteria:
-                search_filters["date"] = {"$gte": filter_criteria["date_from"]}
-        
-        # Modify your vector store query to include filters
-        results = await self.vector_store.similarity_search(
-            query_embedding, 
-            k=limit,
-            filter=search_filters if search_filters else None
-        )
-        
-        return self._format_results(results)
-        
-    except Exception as e:
-        logger.error(f"RAG search error: {str(e)}")
-        raise
\ No newline at end of file
+    positions = [0] * len(source_lists)
+    merged = []
+    while True:
+        heads = [(sources[pos]["confidence"], i) for i, (sources, pos) in enumerate(zip(source_lists, positions))
+                 if pos < len(sources)]
+        if not heads:
+            return merged
+        _, best = max(heads, key=lambda head: (head[0], -head[1]))
+        merged.append(source_lists[best][positions[best]])
+        positions[best] += 1
+
+
+def build_where(filter_criteria: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Translate query/search filter criteria into a Chroma-style metadata filter"""
+    conditions = []
+    if filter_criteria.get("category"):
+        conditions.append({"category": filter_criteria["category"]})
+    if filter_criteria.get("date_from"):
+        conditions.append({"timestamp": {"$gte": int(filter_criteria["date_from"].timestamp())}})
+    if filter_criteria.get("date_to"):
+        conditions.append({"timestamp": {"$lte": int(filter_criteria["date_to"].timestamp())}})
+
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
@@ -0,0 +1,102 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import List, Optional
+
+DEFAULT_RULES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "redaction_rules.json"
+)
+
+
+class Redactor:
+    """Masks PII using the patterns in config/redaction_rules.json.
+
+    All patterns are compiled once into a single alternation of named groups, so a message is
+    scanned in one pass however many rules there are. The rules file is re-read when its
+    mtime changes (checked at most every REDACTION_RELOAD_INTERVAL seconds); a broken edit
+    is reported and the previous rules stay in force.
+    """
+
+    def __init__(self, path: str = None, reload_interval: float = None):
+        self.path = path or os.getenv("REDACTION_RULES_PATH", DEFAULT_RULES_PATH)
+        self.reload_interval = (reload_interval if reload_interval is not None
+                                else float(os.getenv("REDACTION_RELOAD_INTERVAL", "1.0")))
+        self.lock = threading.Lock()
+        self.mtime = None
+        self.last_check = 0.0
+        # (compiled pattern, replacement string or callable); swapped as one reference on reload
+        self.compiled = (None, None)
+        self._reload()
+
+    def redact(self, text: Optional[str]) -> Optional[str]:
+        if not text:
+            return text
+        self._maybe_reload()
+        pattern, replacement = self.compiled
+        if pattern is None:
+            return text
+        return pattern.sub(replacement, text)
+
+    def redact_batch(self, texts: List[str]) -> List[str]:
+        """Redact many texts with one reload check"""
+        self._maybe_reload()
+        pattern, replacement = self.compiled
+        if pattern is None:
+            return list(texts)
+        return [pattern.sub(replacement, text) if text else text for text in texts]
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self.last_check < self.reload_interval:
+            return
+        self.last_check = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self.mtime:
+            self._reload()
+
+    def _reload(self):
+        with self.lock:
+            self.last_check = time.monotonic()
+            try:
+                # Recorded before parsing so a broken file is reported once, not on every call
+                self.mtime = os.stat(self.path).st_mtime_ns
+                with open(self.path) as f:
+                    rules = json.load(f)
+                self.compiled = self._compile(rules)
+            except (OSError, ValueError, KeyError, re.error) as e:
+                print(f"Failed to load redaction rules from {self.path}: {e}")
+
+    @staticmethod
+    def _compile(rules):
+        default = rules.get("replacement", "[REDACTED]")
+        groups = []
+        replacements = {}
+        for i, rule in enumerate(rules.get("patterns", [])):
+            # Group names must be identifiers; the rule name is only used for lookup
+            group = f"r{i}"
+            groups.append(f"(?P<{group}>{rule['pattern']})")
+            replacements[group] = rule.get("replacement", default)
+        if not groups:
+            return None, None
+
+        pattern = re.compile("|".join(groups))
+        if len(set(replacements.values())) == 1:
+            # Uniform replacement: a literal string keeps sub() on its fast path
+            return pattern, next(iter(replacements.values())).replace("\\", "\\\\")
+        return pattern, lambda match: replacements[match.lastgroup]
+
+
+_redactor = None
+
+
+def get_redactor() -> Redactor:
+    """Process-wide redactor; every call site shares the compiled rules"""
+    global _redactor
+    if _redactor is None:
+        _redactor = Redactor()
+    return _redactor
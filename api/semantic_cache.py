@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """Generated answers keyed by question embedding, for near-duplicate questions.
+
+    A lookup hits when a cached question's embedding is within `threshold` cosine similarity
+    of the new one *and* the retrieved context chunk ids are identical, so a paraphrase
+    answered from the same evidence reuses the answer while anything answered from different
+    or re-ingested chunks is regenerated.
+
+    Embeddings live in one preallocated matrix (row per slot), so a lookup is a single
+    matrix-vector product over at most `max_entries` rows. Eviction is LRU.
+    """
+
+    def __init__(self, max_entries: int = None, threshold: float = None, ttl: float = None):
+        self.max_entries = max_entries or int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+        self.threshold = threshold if threshold is not None else \
+            float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+        self.lock = threading.Lock()
+        self.matrix = None  # allocated on first insert, once the embedding size is known
+        self.valid = np.zeros(self.max_entries, dtype=bool)
+        self.slots = OrderedDict()  # slot -> entry, least recently used first
+        self.free_slots = list(range(self.max_entries - 1, -1, -1))
+        self.chunk_slots = {}  # chunk id -> slots whose answer was built from it
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+    def lookup(self, embedding: List[float], context_ids: List[str]) -> Optional[str]:
+        query = self._normalize(embedding)
+        context_key = tuple(context_ids)
+        now = time.monotonic()
+
+        with self.lock:
+            if self.matrix is None or query.shape[0] != self.matrix.shape[1] or not self.slots:
+                self.counters["misses"] += 1
+                return None
+
+            similarities = self.matrix @ query
+            similarities[~self.valid] = -1.0
+            candidates = np.flatnonzero(similarities >= self.threshold)
+            for slot in candidates[np.argsort(-similarities[candidates])]:
+                entry = self.slots[slot]
+                if entry["expires_at"] < now:
+                    self._remove(slot)
+                    continue
+                if entry["context_ids"] == context_key:
+                    self.slots.move_to_end(slot)
+                    self.counters["hits"] += 1
+                    return entry["answer"]
+
+            self.counters["misses"] += 1
+            return None
+
+    def store(self, question: str, embedding: List[float], context_ids: List[str], answer: str):
+        vector = self._normalize(embedding)
+        with self.lock:
+            if self.matrix is None or vector.shape[0] != self.matrix.shape[1]:
+                # First insert, or the embedding model changed: start over at the new size
+                self._reset(vector.shape[0])
+            if not self.free_slots:
+                self._remove(next(iter(self.slots)))
+                self.counters["evictions"] += 1
+
+            slot = self.free_slots.pop()
+            self.matrix[slot] = vector
+            self.valid[slot] = True
+            self.slots[slot] = {
+                "question": question,
+                "context_ids": tuple(context_ids),
+                "answer": answer,
+                "expires_at": time.monotonic() + self.ttl
+            }
+            for chunk_id in set(context_ids):
+                self.chunk_slots.setdefault(chunk_id, set()).add(slot)
+            self.counters["stores"] += 1
+
+    def invalidate_chunks(self, chunk_ids: List[str]):
+        """Drop every answer built from any of these chunks (called when they are upserted or deleted)"""
+        with self.lock:
+            slots = set()
+            for chunk_id in chunk_ids:
+                slots |= self.chunk_slots.get(chunk_id, set())
+            for slot in slots:
+                self._remove(slot)
+            self.counters["invalidations"] += len(slots)
+
+    def clear(self):
+        with self.lock:
+            if self.matrix is not None:
+                self._reset(self.matrix.shape[1])
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return dict(self.counters, entries=len(self.slots),
+                        hit_rate=self.counters["hits"] / lookups if lookups else 0.0)
+
+    def _reset(self, dimensions: int):
+        self.matrix = np.zeros((self.max_entries, dimensions), dtype=np.float32)
+        self.valid[:] = False
+        self.slots.clear()
+        self.free_slots = list(range(self.max_entries - 1, -1, -1))
+        self.chunk_slots = {}
+
+    def _remove(self, slot: int):
+        entry = self.slots.pop(slot)
+        self.valid[slot] = False
+        self.free_slots.append(slot)
+        for chunk_id in set(entry["context_ids"]):
+            slots = self.chunk_slots.get(chunk_id)
+            if slots is not None:
+                slots.discard(slot)
+                if not slots:
+                    del self.chunk_slots[chunk_id]
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+_semantic_cache = None
+
+
+def get_semantic_cache() -> SemanticAnswerCache:
+    """Process-wide answer cache shared by answer generation and ingestion (for invalidation)"""
+    global _semantic_cache
+    if _semantic_cache is None:
+        _semantic_cache = SemanticAnswerCache()
+    return _semantic_cache
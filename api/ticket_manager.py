@@ -1,38 +1,146 @@
+import base64
 import psycopg2
+from psycopg2 import extras, pool
+import itertools
 import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
-async def get_categories(self):
-    """
-    Retrieve distinct categories from the database
+from api.redaction import get_redactor
+
+# Rows per category in ticket_category_count_shards; bounds contention between concurrent inserts
+CATEGORY_COUNT_SHARDS = 16
+
+
+class TicketIdGenerator:
+    """Collision-free ticket ids: TKT-<YYYYmmdd-HHMMSS>-<worker>-<sequence>.
+
+    The worker tag is the process id plus random bits (so ids stay unique across uvicorn
+    workers and hosts) and the sequence is a per-process counter, so any number of
+    tickets can be created in the same second without a database round-trip.
     """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            # Forked workers must not inherit the parent's tag and counter
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.worker = f"{os.getpid():x}{secrets.token_hex(2)}"
+        self.sequence = itertools.count()
+
+    def next_id(self) -> str:
+        with self.lock:
+            sequence = next(self.sequence)
+        return f"TKT-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{self.worker}-{sequence:06d}"
+
+
+# One generator per process, shared by every TicketManager
+ticket_id_generator = TicketIdGenerator()
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque pagination cursor for the (created_at, id) keyset"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
     try:
-        # Assuming you're using MongoDB
-        categories = await self.collection.distinct("category")
-        return [cat for cat in categories if cat]  # Filter out None values
-        
-    except Exception as e:
-        logger.error(f"Error fetching categories: {str(e)}")
-        return []
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
 
 
 class TicketManager:
-    def __init__(self):
-        self.conn = None
+    def __init__(self, min_connections: int = None, max_connections: int = None):
+        self.min_connections = min_connections or int(os.getenv("DB_POOL_MIN", "1"))
+        self.max_connections = max_connections or int(os.getenv("DB_POOL_MAX", "10"))
+        # Idle connections older than this are pinged before being handed out
+        self.healthcheck_interval = float(os.getenv("DB_HEALTHCHECK_INTERVAL", "30"))
+        self.pool = None
+        self.pool_lock = threading.Lock()
+        # ThreadedConnectionPool raises instead of waiting when exhausted; callers queue here
+        self.available = threading.BoundedSemaphore(self.max_connections)
+        self.last_used = {}
+        self.id_generator = ticket_id_generator
+        self.categories_ttl = float(os.getenv("CATEGORY_CACHE_TTL", "30"))
+        self.categories_cache = None
+        self.redactor = get_redactor()
 
-    def get_connection(self):
-        if self.conn is None or self.conn.closed:
-            self.conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-        return self.conn
+    def get_pool(self) -> pool.ThreadedConnectionPool:
+        with self.pool_lock:
+            if self.pool is None:
+                self.pool = pool.ThreadedConnectionPool(
+                    self.min_connections, self.max_connections, os.getenv("DATABASE_URL")
+                )
+            return self.pool
+
+    @contextmanager
+    def connection(self):
+        """Borrow a healthy pooled connection; commits on success and rolls back on error"""
+        connection_pool = self.get_pool()
+        self.available.acquire()
+        conn = None
+        try:
+            conn = self._checkout(connection_pool)
+            yield conn
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # The connection itself is broken; drop it so the pool opens a fresh one
+            if conn is not None:
+                connection_pool.putconn(conn, close=True)
+                self.last_used.pop(id(conn), None)
+                conn = None
+            raise
+        except Exception:
+            if conn is not None:
+                conn.rollback()
+            raise
+        finally:
+            if conn is not None:
+                self.last_used[id(conn)] = time.monotonic()
+                connection_pool.putconn(conn)
+            self.available.release()
+
+    def _checkout(self, connection_pool: pool.ThreadedConnectionPool):
+        """Get a connection from the pool, replacing it once if it fails the health check"""
+        conn = connection_pool.getconn()
+        if self._is_healthy(conn):
+            return conn
+        connection_pool.putconn(conn, close=True)
+        self.last_used.pop(id(conn), None)
+        return connection_pool.getconn()
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        idle = time.monotonic() - self.last_used.get(id(conn), 0.0)
+        if idle < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
 
     def create_ticket(self, customer_message: str, classification: str, suggested_reply: str) -> Dict[str, Any]:
         """Create a new support ticket in the database"""
-        conn = self.get_connection()
-        cur = conn.cursor()
+        # Customer PII never reaches the tickets table
+        customer_message = self.redactor.redact(customer_message)
+        suggested_reply = self.redactor.redact(suggested_reply)
 
-        try:
-            ticket_id = f"TKT-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        with self.connection() as conn, conn.cursor() as cur:
+            ticket_id = self.id_generator.next_id()
 
             cur.execute("""
                 INSERT INTO tickets 
@@ -40,37 +148,232 @@ class TicketManager:
                 VALUES (%s, %s, %s, %s, %s, %s)
             """, (ticket_id, customer_message, classification, suggested_reply, "open", datetime.now()))
 
-            conn.commit()
+        self.categories_cache = None
 
-            return {
-                "ticket_id": ticket_id,
-                "status": "created",
-                "classification": classification
-            }
+        return {
+            "ticket_id": ticket_id,
+            "status": "created",
+            "classification": classification
+        }
 
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            cur.close()
+    def create_tickets_bulk(self, rows: List[Dict[str, Any]]) -> List[str]:
+        """Insert many tickets in a single transaction; returns ticket ids in input order"""
+        now = datetime.now()
+        messages = self.redactor.redact_batch([row["customer_message"] for row in rows])
+        replies = self.redactor.redact_batch([row.get("suggested_reply") for row in rows])
+        ticket_ids = []
+        values = []
+        for row, message, reply in zip(rows, messages, replies):
+            ticket_id = self.id_generator.next_id()
+            ticket_ids.append(ticket_id)
+            values.append((
+                ticket_id,
+                message,
+                row["classification"],
+                reply,
+                row.get("status", "open"),
+                row.get("created_at") or now
+            ))
+
+        with self.connection() as conn, conn.cursor() as cur:
+            # One multi-row INSERT per page instead of one statement and commit per ticket
+            extras.execute_values(cur, """
+                INSERT INTO tickets
+                (ticket_id, customer_message, classification, suggested_reply, status, created_at)
+                VALUES %s
+            """, values, page_size=1000)
+
+        self.categories_cache = None
+
+        return ticket_ids
+
+    def list_tickets(self, limit: int = 10, cursor: Optional[str] = None, status: Optional[str] = None,
+                     classification: Optional[str] = None, date_from: Optional[datetime] = None,
+                     date_to: Optional[datetime] = None) -> Dict[str, Any]:
+        """Newest-first ticket page with optional filters.
+
+        Pagination is keyset-based: pass back `next_cursor` to continue after the last row,
+        so every page is an index range scan instead of an OFFSET over the whole table.
+        """
+        conditions = []
+        params = []
+        if status:
+            conditions.append("status = %s")
+            params.append(status)
+        if classification:
+            conditions.append("classification = %s")
+            params.append(classification)
+        if date_from:
+            conditions.append("created_at >= %s")
+            params.append(date_from)
+        if date_to:
+            conditions.append("created_at < %s")
+            params.append(date_to)
+        if cursor:
+            conditions.append("(created_at, id) < (%s, %s)")
+            params.extend(decode_cursor(cursor))
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT id, ticket_id, customer_message, classification, suggested_reply, status, created_at
+                FROM tickets {where}
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
+            """, (*params, limit + 1))
+            rows = cur.fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        tickets = []
+        for row in rows:
+            tickets.append({
+                "ticket_id": row[1],
+                "customer_message": row[2],
+                "classification": row[3],
+                "suggested_reply": row[4],
+                "status": row[5],
+                "created_at": row[6].isoformat() if row[6] else None
+            })
+
+        return {
+            "tickets": tickets,
+            "next_cursor": encode_cursor(rows[-1][6], rows[-1][0]) if has_more else None
+        }
+
+    def get_categories(self) -> List[Dict[str, Any]]:
+        """Ticket categories with counts, summed from the trigger-maintained count shards.
+
+        The result is also cached in-process for CATEGORY_CACHE_TTL seconds, so repeated
+        dropdown loads do not reach the database at all.
+        """
+        now = time.monotonic()
+        if self.categories_cache is not None and now - self.categories_cache[0] < self.categories_ttl:
+            return self.categories_cache[1]
+
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT category, SUM(ticket_count) AS total FROM ticket_category_count_shards
+                GROUP BY category HAVING SUM(ticket_count) > 0
+                ORDER BY total DESC, category
+            """)
+            categories = [{"name": row[0], "count": int(row[1])} for row in cur.fetchall()]
+
+        self.categories_cache = (now, categories)
+        return categories
+
+    def labeled_messages(self) -> List[Tuple[str, str]]:
+        """(customer_message, classification) pairs for training the triage model"""
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT customer_message, classification FROM tickets
+                WHERE customer_message IS NOT NULL AND classification IS NOT NULL
+            """)
+            return cur.fetchall()
 
     def init_db(self):
         """Initialize the database schema"""
-        conn = self.get_connection()
-        cur = conn.cursor()
+        with self.connection() as conn, conn.cursor() as cur:
+            # Several workers run init_db at startup; serialize them for the one-off backfill
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext('convosearch_init_db'))")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS tickets (
+                    id SERIAL PRIMARY KEY,
+                    ticket_id VARCHAR(50) UNIQUE NOT NULL,
+                    customer_message TEXT NOT NULL,
+                    classification VARCHAR(20) NOT NULL,
+                    suggested_reply TEXT,
+                    status VARCHAR(20) DEFAULT 'open',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    resolved_at TIMESTAMP NULL
+                )
+            """)
+
+            # Listing order plus one composite index per filter, all ending in the keyset
+            # (created_at, id) so filtered pages are served by an index range scan
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_tickets_created_at
+                ON tickets (created_at DESC, id DESC)
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_tickets_status_created_at
+                ON tickets (status, created_at DESC, id DESC)
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_tickets_classification_created_at
+                ON tickets (classification, created_at DESC, id DESC)
+            """)
+            # Open tickets are what the dashboard polls; keep that index small
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_tickets_open_created_at
+                ON tickets (created_at DESC, id DESC) WHERE status = 'open'
+            """)
+
+            self._init_category_counts(cur)
+
+    def _init_category_counts(self, cur):
+        """Per-category ticket counts kept current by statement-level triggers on tickets.
+
+        Each category's count is spread over CATEGORY_COUNT_SHARDS rows and a statement
+        updates the shard picked by its backend pid, so concurrent inserts into the same
+        category lock different rows instead of queueing on one. Readers sum the shards.
+        """
+        cur.execute("SELECT to_regclass('ticket_category_count_shards') IS NULL")
+        needs_backfill = cur.fetchone()[0]
 
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS tickets (
-                id SERIAL PRIMARY KEY,
-                ticket_id VARCHAR(50) UNIQUE NOT NULL,
-                customer_message TEXT NOT NULL,
-                classification VARCHAR(20) NOT NULL,
-                suggested_reply TEXT,
-                status VARCHAR(20) DEFAULT 'open',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                resolved_at TIMESTAMP NULL
+            CREATE TABLE IF NOT EXISTS ticket_category_count_shards (
+                category VARCHAR(20) NOT NULL,
+                shard SMALLINT NOT NULL,
+                ticket_count BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (category, shard)
             )
         """)
+        cur.execute(f"""
+            CREATE OR REPLACE FUNCTION ticket_category_counts_apply() RETURNS trigger AS $$
+            DECLARE
+                target_shard SMALLINT := pg_backend_pid() % {CATEGORY_COUNT_SHARDS};
+            BEGIN
+                IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                    INSERT INTO ticket_category_count_shards (category, shard, ticket_count)
+                    SELECT classification, target_shard, -COUNT(*) FROM old_rows GROUP BY classification
+                    ON CONFLICT (category, shard)
+                    DO UPDATE SET ticket_count = ticket_category_count_shards.ticket_count + EXCLUDED.ticket_count;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO ticket_category_count_shards (category, shard, ticket_count)
+                    SELECT classification, target_shard, COUNT(*) FROM new_rows GROUP BY classification
+                    ON CONFLICT (category, shard)
+                    DO UPDATE SET ticket_count = ticket_category_count_shards.ticket_count + EXCLUDED.ticket_count;
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        # One trigger per event: transition tables cannot be shared across INSERT/UPDATE/DELETE
+        cur.execute("DROP TRIGGER IF EXISTS tickets_category_counts_insert ON tickets")
+        cur.execute("""
+            CREATE TRIGGER tickets_category_counts_insert AFTER INSERT ON tickets
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION ticket_category_counts_apply()
+        """)
+        cur.execute("DROP TRIGGER IF EXISTS tickets_category_counts_update ON tickets")
+        cur.execute("""
+            CREATE TRIGGER tickets_category_counts_update AFTER UPDATE ON tickets
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION ticket_category_counts_apply()
+        """)
+        cur.execute("DROP TRIGGER IF EXISTS tickets_category_counts_delete ON tickets")
+        cur.execute("""
+            CREATE TRIGGER tickets_category_counts_delete AFTER DELETE ON tickets
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION ticket_category_counts_apply()
+        """)
 
-        conn.commit()
-        cur.close()
\ No newline at end of file
+        if needs_backfill:
+            # One-off aggregation of tickets that existed before the counts table
+            cur.execute("""
+                INSERT INTO ticket_category_count_shards (category, shard, ticket_count)
+                SELECT classification, 0, COUNT(*) FROM tickets GROUP BY classification
+            """)
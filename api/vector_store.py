@@ -0,0 +1,455 @@
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from api.ann_index import IVFIndex, index_from_env
+
+
+class VectorStore(ABC):
+    """Storage and similarity search for embedded document chunks"""
+
+    @abstractmethod
+    def add(self, collection_name: str, ids: List[str], documents: List[str],
+            metadatas: List[Dict[str, Any]], embeddings: List[List[float]]):
+        """Upsert: ids that already exist get the new document, metadata and embedding"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, collection_name: str, ids: List[str]):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, collection_name: str, ids: List[str], include_embeddings: bool = False) -> Dict[str, Any]:
+        """Return documents and metadatas (and optionally embeddings) for the given ids, in Chroma's get() shape"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def query(self, collection_name: str, query_embeddings: List[List[float]], n_results: int = 3,
+              where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Return the nearest chunks per query embedding, in Chroma's query() shape"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def count(self, collection_name: str) -> int:
+        raise NotImplementedError
+
+    def flush(self, collection_name: str):
+        """Persist buffered writes; backends that write through need not override"""
+        pass
+
+    @abstractmethod
+    def distance_metric(self, collection_name: str) -> str:
+        """Name of the distance function behind the returned distances ("l2", "cosine", "ip")"""
+        raise NotImplementedError
+
+
+class ChromaVectorStore(VectorStore):
+    """Chroma server accessed over HTTP"""
+
+    def __init__(self):
+        import chromadb
+
+        self.client = chromadb.HttpClient(
+            host=os.getenv("CHROMA_HOST", "localhost"),
+            port=os.getenv("CHROMA_PORT", "8001")
+        )
+
+    def add(self, collection_name, ids, documents, metadatas, embeddings):
+        collection = self.client.get_or_create_collection(collection_name)
+        collection.upsert(documents=documents, metadatas=metadatas, ids=ids, embeddings=embeddings)
+
+    def delete(self, collection_name, ids):
+        if ids:
+            self.client.get_or_create_collection(collection_name).delete(ids=ids)
+
+    def get(self, collection_name, ids, include_embeddings=False):
+        collection = self.client.get_collection(collection_name)
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        return collection.get(ids=ids, include=include)
+
+    def query(self, collection_name, query_embeddings, n_results=3, where=None):
+        collection = self.client.get_collection(collection_name)
+        return collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where or None,
+            include=["documents", "metadatas", "distances"]
+        )
+
+    def count(self, collection_name):
+        return self.client.get_or_create_collection(collection_name).count()
+
+    def distance_metric(self, collection_name):
+        metadata = self.client.get_collection(collection_name).metadata or {}
+        return metadata.get("hnsw:space", "l2")
+
+
+class NumpyCollection:
+    """One collection held as a contiguous, row-normalized float32 matrix.
+
+    Once a collection reaches ANN_MIN_SIZE rows an IVF index is trained over it and
+    searches become sub-linear; smaller collections stay on exact brute force.
+    """
+
+    def __init__(self, dim: int = 0):
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self.id_to_row = {}
+        # Rows [0, size) of buffer are live; capacity doubles as it fills, so appends are amortized O(1)
+        self.buffer = np.zeros((0, dim), dtype=np.float32)
+        self.size = 0
+        self.index = None
+        self.ann_min_size = int(os.getenv("ANN_MIN_SIZE", "50000"))
+        # Bumped whenever existing rows are renumbered, so an index trained on a snapshot can tell
+        self.generation = 0
+        self.training = False
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self.buffer[:self.size]
+
+    @matrix.setter
+    def matrix(self, matrix: np.ndarray):
+        self.buffer = matrix
+        self.size = matrix.shape[0]
+
+    def add(self, ids, documents, metadatas, embeddings):
+        vectors = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        if self.size == 0 and self.buffer.shape[1] != vectors.shape[1]:
+            self.buffer = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+
+        new_rows = []
+        updated = {}  # existing row -> input index; a later duplicate id in the batch wins
+        for i, chunk_id in enumerate(ids):
+            row = self.id_to_row.get(chunk_id)
+            if row is None:
+                self.id_to_row[chunk_id] = len(self.ids)
+                self.ids.append(chunk_id)
+                self.documents.append(documents[i])
+                self.metadatas.append(metadatas[i])
+                new_rows.append(i)
+            else:
+                self.documents[row] = documents[i]
+                self.metadatas[row] = metadatas[i]
+                if row < self.size:
+                    updated[row] = i
+                else:
+                    # Repeated within this batch before being written; overwrite the pending vector
+                    new_rows[row - self.size] = i
+
+        if updated:
+            rows = np.fromiter(updated.keys(), dtype=np.int64, count=len(updated))
+            sources = list(updated.values())
+            self._reserve(self.size)
+            self.buffer[rows] = vectors[sources]
+            # An index training on a snapshot would hold stale assignments for these rows
+            self.generation += 1
+            if self.index is not None:
+                self.index.update(vectors[sources], rows)
+
+        if new_rows:
+            start_row = self.size
+            self._reserve(self.size + len(new_rows))
+            self.buffer[start_row:start_row + len(new_rows)] = vectors[new_rows]
+            self.size += len(new_rows)
+            if self.index is not None:
+                self.index.add(vectors[new_rows], start_row)
+
+    def needs_index(self) -> bool:
+        return self.index is None and not self.training and self.size >= self.ann_min_size
+
+    def install_index(self, index: IVFIndex, trained_rows: int, generation: int) -> bool:
+        """Adopt an index trained on the first `trained_rows` rows, catching up on rows added since.
+
+        Returns False (discarding the index) if rows were renumbered while it was training.
+        """
+        if generation != self.generation or trained_rows > self.size:
+            return False
+        index.add(self.matrix[trained_rows:], trained_rows)
+        self.index = index
+        return True
+
+    def delete(self, ids):
+        rows = sorted(self.id_to_row[chunk_id] for chunk_id in ids if chunk_id in self.id_to_row)
+        if not rows:
+            return
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[rows] = False
+        kept = self.matrix[keep]
+        self._reserve(self.size)
+        self.buffer[:len(kept)] = kept
+        self.size = len(kept)
+        self.generation += 1
+        if self.index is not None:
+            self.index.remove(keep)
+        self.ids = [x for x, k in zip(self.ids, keep) if k]
+        self.documents = [x for x, k in zip(self.documents, keep) if k]
+        self.metadatas = [x for x, k in zip(self.metadatas, keep) if k]
+        self.id_to_row = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+
+    def _reserve(self, rows: int):
+        """Make the buffer writable (it is memory-mapped read-only after a load) with room for `rows`"""
+        if rows <= self.buffer.shape[0] and self.buffer.flags.writeable:
+            return
+        capacity = max(rows, 2 * self.buffer.shape[0], 1024)
+        buffer = np.empty((capacity, self.buffer.shape[1]), dtype=np.float32)
+        buffer[:self.size] = self.buffer[:self.size]
+        self.buffer = buffer
+
+    def search(self, queries: np.ndarray, n_results: int, where: Optional[Dict[str, Any]] = None):
+        """Cosine top-k per query; returns (rows, similarities) per query"""
+        if self.index is not None:
+            return [self._search_ann(query, n_results, where) for query in queries]
+        return self._search_exact(queries, n_results, self._filter_rows(where))
+
+    def _search_exact(self, queries: np.ndarray, n_results: int, candidates: Optional[np.ndarray]):
+        """Batched brute-force top-k over all rows, or only the candidate rows"""
+        matrix = self.matrix if candidates is None else self.matrix[candidates]
+        if matrix.shape[0] == 0:
+            return [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)) for _ in queries]
+
+        similarities = queries @ matrix.T
+        k = min(n_results, matrix.shape[0])
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+
+        results = []
+        for q in range(similarities.shape[0]):
+            order = top[q][np.argsort(-similarities[q, top[q]])]
+            rows = order if candidates is None else candidates[order]
+            results.append((rows, similarities[q, order]))
+        return results
+
+    def _search_ann(self, query: np.ndarray, n_results: int, where: Optional[Dict[str, Any]]):
+        candidates = self.index.candidates(query)
+        if where:
+            candidates = candidates[[matches_where(self.metadatas[r], where) for r in candidates]]
+            if len(candidates) < n_results:
+                # Selective filter emptied the probed lists; fall back to exact filtered search
+                return self._search_exact(query.reshape(1, -1), n_results, self._filter_rows(where))[0]
+        return self._search_exact(query.reshape(1, -1), n_results, np.asarray(candidates, dtype=np.int64))[0]
+
+    def _filter_rows(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        return np.array([i for i, m in enumerate(self.metadatas) if matches_where(m, where)], dtype=np.int64)
+
+
+class NumpyVectorStore(VectorStore):
+    """Embedded vector store: cosine search over in-memory NumPy matrices.
+
+    Writes are buffered in memory until flush(). Each collection then persists to
+    <path>/<collection>/embeddings.npy (memory-mapped on load)
+    plus records.json for ids, documents and metadata, and ivf_index.npz once the
+    collection is large enough to be served from the ANN index.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("VECTOR_STORE_PATH", "data/vectors")
+        self.collections = {}
+        self.dirty = set()
+        self.lock = threading.RLock()
+
+    def add(self, collection_name, ids, documents, metadatas, embeddings):
+        with self.lock:
+            collection = self._collection(collection_name)
+            collection.add(ids, documents, metadatas, embeddings)
+            self.dirty.add(collection_name)
+            if not collection.needs_index():
+                return
+            # Snapshot under the lock, train without it so queries keep running meanwhile
+            collection.training = True
+            snapshot = np.array(collection.matrix)
+            generation = collection.generation
+
+        try:
+            index = index_from_env()
+            index.train(snapshot)
+        except Exception:
+            with self.lock:
+                collection.training = False
+            raise
+
+        with self.lock:
+            collection.training = False
+            collection.install_index(index, snapshot.shape[0], generation)
+
+    def delete(self, collection_name, ids):
+        with self.lock:
+            self._collection(collection_name).delete(ids)
+            self.dirty.add(collection_name)
+
+    def flush(self, collection_name):
+        with self.lock:
+            if collection_name in self.dirty:
+                self._save(collection_name, self.collections[collection_name])
+                self.dirty.discard(collection_name)
+
+    def get(self, collection_name, ids, include_embeddings=False):
+        with self.lock:
+            collection = self._collection(collection_name, create=False)
+            rows = [collection.id_to_row[i] for i in ids if i in collection.id_to_row]
+            response = {
+                "ids": [collection.ids[r] for r in rows],
+                "documents": [collection.documents[r] for r in rows],
+                "metadatas": [collection.metadatas[r] for r in rows]
+            }
+            if include_embeddings:
+                # Rows are stored normalized, which is all a cosine comparison needs
+                response["embeddings"] = collection.matrix[rows].tolist()
+            return response
+
+    def query(self, collection_name, query_embeddings, n_results=3, where=None):
+        queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+
+        with self.lock:
+            collection = self._collection(collection_name, create=False)
+            response = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            for rows, similarities in collection.search(queries, n_results, where):
+                response["ids"].append([collection.ids[r] for r in rows])
+                response["documents"].append([collection.documents[r] for r in rows])
+                response["metadatas"].append([collection.metadatas[r] for r in rows])
+                response["distances"].append([float(1 - s) for s in similarities])
+            return response
+
+    def count(self, collection_name):
+        return len(self._collection(collection_name).ids)
+
+    def distance_metric(self, collection_name):
+        return "cosine"
+
+    def _collection(self, collection_name: str, create: bool = True) -> NumpyCollection:
+        with self.lock:
+            if collection_name not in self.collections:
+                collection = self._load(collection_name)
+                if collection is None:
+                    if not create:
+                        raise ValueError(f"Collection {collection_name} does not exist.")
+                    collection = NumpyCollection()
+                self.collections[collection_name] = collection
+            return self.collections[collection_name]
+
+    def _load(self, collection_name: str) -> Optional[NumpyCollection]:
+        directory = os.path.join(self.path, collection_name)
+        records_path = os.path.join(directory, "records.json")
+        if not os.path.exists(records_path):
+            return None
+
+        with open(records_path) as f:
+            records = json.load(f)
+
+        collection = NumpyCollection()
+        collection.ids = records["ids"]
+        collection.documents = records["documents"]
+        collection.metadatas = records["metadatas"]
+        collection.id_to_row = {chunk_id: row for row, chunk_id in enumerate(collection.ids)}
+        collection.matrix = np.load(os.path.join(directory, "embeddings.npy"), mmap_mode="r")
+        ivf_path = os.path.join(directory, "ivf_index.npz")
+        if os.path.exists(ivf_path):
+            collection.index = IVFIndex.load(ivf_path)
+            collection.index.n_probe = int(os.getenv("ANN_N_PROBE", collection.index.n_probe))
+        return collection
+
+    def _save(self, collection_name: str, collection: NumpyCollection):
+        directory = os.path.join(self.path, collection_name)
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to temp files and rename so readers never see a half-written collection
+        matrix_tmp = os.path.join(directory, "embeddings.tmp.npy")
+        np.save(matrix_tmp, collection.matrix)
+        os.replace(matrix_tmp, os.path.join(directory, "embeddings.npy"))
+
+        if collection.index is not None:
+            index_tmp = os.path.join(directory, "ivf_index.tmp.npz")
+            collection.index.save(index_tmp)
+            os.replace(index_tmp, os.path.join(directory, "ivf_index.npz"))
+
+        records_tmp = os.path.join(directory, "records.json.tmp")
+        with open(records_tmp, "w") as f:
+            json.dump({
+                "ids": collection.ids,
+                "documents": collection.documents,
+                "metadatas": collection.metadatas
+            }, f)
+        os.replace(records_tmp, os.path.join(directory, "records.json"))
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(vectors / norms, dtype=np.float32)
+
+
+def matches_where(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    """Evaluate a Chroma-style metadata filter ($eq, $ne, $gt, $gte, $lt, $lte, $in, $nin, $and, $or)"""
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        else:
+            value = metadata.get(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, operand in condition.items():
+                if not _compare(value, op, operand):
+                    return False
+    return True
+
+
+def _compare(value: Any, op: str, operand: Any) -> bool:
+    if op == "$eq":
+        return value == operand
+    if op == "$ne":
+        return value != operand
+    if op == "$in":
+        return value in operand
+    if op == "$nin":
+        return value not in operand
+    if value is None:
+        return False
+    if op == "$gt":
+        return value > operand
+    if op == "$gte":
+        return value >= operand
+    if op == "$lt":
+        return value < operand
+    if op == "$lte":
+        return value <= operand
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+_vector_store = None
+_embedding_function = None
+
+
+def get_vector_store() -> VectorStore:
+    """Process-wide vector store selected by VECTOR_BACKEND ("chroma" or "numpy")"""
+    global _vector_store
+    if _vector_store is None:
+        backend = os.getenv("VECTOR_BACKEND", "chroma").lower()
+        if backend == "chroma":
+            _vector_store = ChromaVectorStore()
+        elif backend == "numpy":
+            _vector_store = NumpyVectorStore()
+        else:
+            raise ValueError(f"Unknown VECTOR_BACKEND: {backend}")
+    return _vector_store
+
+
+def get_embedding_function():
+    """Embedding function shared by ingestion and querying (Chroma's default MiniLM model)"""
+    global _embedding_function
+    if _embedding_function is None:
+        from chromadb.utils import embedding_functions
+
+        _embedding_function = embedding_functions.DefaultEmbeddingFunction()
+    return _embedding_function
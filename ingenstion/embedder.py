@@ -1,38 +1,219 @@
-import chromadb
-from chromadb.config import Settings
-from typing import List
+import asyncio
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional, AsyncIterator
 from .parser import DocumentChunk
+from .manifest import IngestManifest
+from api.cache import get_query_cache
+from api.calibration import get_calibrator, distance_to_similarity
+from api.keyword_index import get_keyword_index
+from api.semantic_cache import get_semantic_cache
+from api.vector_store import get_vector_store, get_embedding_function
+from models.triage_classifier.classifier import TriageClassifier
 
 
 class EmbeddingGenerator:
-    def __init__(self):
-        self.client = chromadb.HttpClient(
-            host=os.getenv("CHROMA_HOST", "localhost"),
-            port=os.getenv("CHROMA_PORT", "8001")
-        )
+    def __init__(self, batch_size: int = None, max_workers: int = None):
+        self.store = get_vector_store()
+        self.keyword_index = get_keyword_index()
+        self.calibrator = get_calibrator()
+        self.answer_cache = get_semantic_cache()
+        # Chunks are labelled with the ticket triage categories, the vocabulary /api/categories serves
+        self.triage_classifier = TriageClassifier()
+        self.calibration_sample = int(os.getenv("CALIBRATION_SAMPLE", "16"))
+        self.embedding_function = get_embedding_function()
+        self.batch_size = batch_size or int(os.getenv("EMBED_BATCH_SIZE", "64"))
+        self.max_workers = max_workers or int(os.getenv("EMBED_WORKERS", "4"))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="embed")
+        # One manifest object per collection, shared by concurrent ingests so none overwrites another's entries
+        self.manifests = {}
+        self.manifests_lock = threading.Lock()
 
-    async def generate_embeddings(self, chunks: List[DocumentChunk], collection_name: str):
+    async def generate_embeddings(self, chunks: List[DocumentChunk], collection_name: str,
+                                  progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+                                  ) -> Dict[str, Any]:
         """Generate embeddings and store in vector database"""
-        collection = self.client.get_or_create_collection(collection_name)
+        async def batches():
+            for i in range(0, len(chunks), self.batch_size):
+                yield chunks[i:i + self.batch_size]
+
+        return await self.ingest_batches(batches(), collection_name, progress_callback)
+
+    async def ingest_stream(self, chunks: AsyncIterator[DocumentChunk], collection_name: str,
+                            progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+                            ) -> Dict[str, Any]:
+        """Group a stream of chunks into batches as they arrive and ingest them"""
+        async def batches():
+            batch = []
+            async for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        return await self.ingest_batches(batches(), collection_name, progress_callback)
+
+    async def ingest_batches(self, batches: AsyncIterator[List[DocumentChunk]], collection_name: str,
+                             progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+                             ) -> Dict[str, Any]:
+        """Embed batches on the worker pool and upsert each one as soon as it is ready.
+
+        At most `max_workers` batches are in flight; pulling the next batch waits until one
+        finishes, so memory stays bounded by the pool size rather than the input size.
+
+        Ingestion is incremental: chunks whose content-addressed id is already in the
+        collection's manifest are skipped, and previously ingested chunks of a source that
+        no longer appear in it are deleted.
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        progress = {"collection": collection_name, "chunks": 0, "batches": 0, "skipped": 0, "deleted": 0}
+        pending = set()
+        seen = {}  # source -> chunk ids present in this ingest
+
+        # Manifest JSON is read and written on the worker pool, never on the event loop
+        manifest = await loop.run_in_executor(self.executor, self._manifest, collection_name)
+        if len(manifest) and await loop.run_in_executor(self.executor, self.store.count, collection_name) == 0:
+            # The vector store was wiped behind our back; re-embed everything
+            manifest.clear()
+            self.calibrator.reset(collection_name)
+        elif len(manifest) and self.keyword_index.count(collection_name) == 0:
+            # Collection predates the keyword index: backfill it from the stored documents
+            await loop.run_in_executor(self.executor, self._backfill_keyword_index, collection_name, manifest)
+
+        async def drain(return_when):
+            nonlocal pending
+            done, pending = await asyncio.wait(pending, return_when=return_when)
+            for task in done:
+                stored = task.result()
+                progress["chunks"] += stored
+                progress["batches"] += 1
+                self._report(progress, start, progress_callback)
+
+        async for batch in batches:
+            fresh = []
+            for chunk in batch:
+                source_ids = seen.setdefault(chunk.metadata["source"], set())
+                if chunk.chunk_id in source_ids or manifest.contains(chunk.metadata["source"], chunk.chunk_id):
+                    progress["skipped"] += 1
+                else:
+                    fresh.append(chunk)
+                source_ids.add(chunk.chunk_id)
+            if not fresh:
+                continue
+            if len(pending) >= self.max_workers:
+                await drain(asyncio.FIRST_COMPLETED)
+            pending.add(loop.run_in_executor(self.executor, self._embed_and_store, fresh, collection_name, manifest))
+
+        if pending:
+            await drain(asyncio.ALL_COMPLETED)
+
+        for source, chunk_ids in seen.items():
+            stale = manifest.known_ids(source) - chunk_ids
+            if stale:
+                await loop.run_in_executor(self.executor, self.store.delete, collection_name, sorted(stale))
+                self.keyword_index.delete(collection_name, stale)
+                self.answer_cache.invalidate_chunks(stale)
+                manifest.forget(source, stale)
+                progress["deleted"] += len(stale)
 
-        documents = []
+        await loop.run_in_executor(self.executor, self.store.flush, collection_name)
+        await loop.run_in_executor(self.executor, self.keyword_index.flush, collection_name)
+        await loop.run_in_executor(self.executor, manifest.save)
+        await loop.run_in_executor(self.executor, self.calibrator.save)
+
+        # Cached search results for this collection are now stale
+        get_query_cache().invalidate_collection(collection_name)
+
+        stats = self._report(progress, start, None)
+        print(f"Added {stats['chunks']} chunks to collection '{collection_name}' "
+              f"in {stats['seconds']:.2f}s ({stats['chunks_per_sec']:.1f} chunks/sec), "
+              f"skipped {stats['skipped']} unchanged, deleted {stats['deleted']} stale")
+        return stats
+
+    def _embed_and_store(self, chunks: List[DocumentChunk], collection_name: str,
+                         manifest: IngestManifest) -> int:
+        """Worker-thread body: embed and upsert one batch (chunks were redacted by the parser)"""
+        documents = [chunk.content for chunk in chunks]
+        classifications = self.triage_classifier.classify_batch(documents)
         metadatas = []
         ids = []
+        # Epoch seconds, so the vector store can range-filter on it ($gte / $lte)
+        timestamp = int(time.time())
 
-        for chunk in chunks:
-            documents.append(chunk.content)
+        for chunk, classification in zip(chunks, classifications):
             metadatas.append({
                 "doc_type": chunk.doc_type,
                 "source": chunk.metadata["source"],
-                "chunk_id": chunk.chunk_id
+                "chunk_id": chunk.chunk_id,
+                "category": chunk.metadata.get("category") or classification["classification"],
+                "timestamp": chunk.metadata.get("timestamp", timestamp)
             })
             ids.append(chunk.chunk_id)
 
-        collection.add(
+        embeddings = [list(e) for e in self.embedding_function(documents)]
+
+        self.store.add(
+            collection_name,
+            ids=ids,
             documents=documents,
             metadatas=metadatas,
-            ids=ids
+            embeddings=embeddings
         )
+        self.keyword_index.add(collection_name, ids, documents)
+        # Answers built from an earlier version of these chunks are stale
+        self.answer_cache.invalidate_chunks(ids)
+        self._observe_neighbours(collection_name, ids, embeddings)
+
+        hashes = {}
+        for chunk in chunks:
+            hashes.setdefault(chunk.metadata["source"], {})[chunk.chunk_id] = chunk.content_hash
+        for source, entries in hashes.items():
+            manifest.record(source, entries)
+        return len(ids)
+
+    def _manifest(self, collection_name: str) -> IngestManifest:
+        with self.manifests_lock:
+            manifest = self.manifests.get(collection_name)
+            if manifest is None:
+                return self.manifests.setdefault(collection_name, IngestManifest(collection_name))
+        # Other worker processes may have saved sources since this one last looked
+        manifest.refresh()
+        return manifest
+
+    def _observe_neighbours(self, collection_name: str, ids: List[str], embeddings: List[List[float]]):
+        """Record how similar a sample of the new chunks is to their nearest existing neighbour"""
+        sample = min(len(ids), self.calibration_sample)
+        if not sample:
+            return
+        rows = [i * len(ids) // sample for i in range(sample)]
+
+        metric = self.store.distance_metric(collection_name)
+        results = self.store.query(collection_name, [embeddings[r] for r in rows], n_results=2)
+        similarities = []
+        for row, neighbour_ids, distances in zip(rows, results["ids"], results["distances"]):
+            for neighbour_id, distance in zip(neighbour_ids, distances):
+                if neighbour_id != ids[row] and distance is not None:
+                    similarities.append(distance_to_similarity(distance, metric))
+                    break
+        self.calibrator.observe(collection_name, similarities)
+
+    def _backfill_keyword_index(self, collection_name: str, manifest: IngestManifest):
+        ids = [chunk_id for source in manifest.source_names() for chunk_id in manifest.known_ids(source)]
+        for i in range(0, len(ids), self.batch_size):
+            stored = self.store.get(collection_name, ids[i:i + self.batch_size])
+            self.keyword_index.add(collection_name, stored["ids"], stored["documents"])
 
-        print(f"Added {len(documents)} chunks to collection '{collection_name}'")
\ No newline at end of file
+    @staticmethod
+    def _report(progress: Dict[str, Any], start: float,
+                progress_callback: Optional[Callable[[Dict[str, Any]], None]]) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - start
+        stats = dict(progress, seconds=elapsed,
+                     chunks_per_sec=progress["chunks"] / elapsed if elapsed > 0 else 0.0)
+        if progress_callback is not None:
+            progress_callback(stats)
+        return stats
@@ -0,0 +1,97 @@
+import json
+import os
+import threading
+from typing import Dict, List, Set
+
+from api.file_lock import file_lock
+
+
+class IngestManifest:
+    """Local record of which chunk ids (and content hashes) are embedded per collection and source.
+
+    Stored as <path>/<collection>.json: {source: {chunk_id: content_hash}}. Several worker
+    processes may ingest into the same collection, so changes are journaled and replayed
+    onto the file's current contents under a file lock on save, instead of overwriting it.
+    """
+
+    def __init__(self, collection_name: str, path: str = None):
+        self.collection_name = collection_name
+        directory = path or os.getenv("INGEST_MANIFEST_PATH", "data/manifests")
+        self.file_path = os.path.join(directory, f"{collection_name}.json")
+        self.lock = threading.Lock()
+        self.sources = self._load()
+        self.changes = []  # record/forget/clear operations not yet saved
+
+    def known_ids(self, source: str) -> Set[str]:
+        # Shared by concurrent ingests; worker threads record while others read
+        with self.lock:
+            return set(self.sources.get(source, {}))
+
+    def contains(self, source: str, chunk_id: str) -> bool:
+        with self.lock:
+            return chunk_id in self.sources.get(source, {})
+
+    def source_names(self) -> List[str]:
+        with self.lock:
+            return list(self.sources)
+
+    def record(self, source: str, hashes: Dict[str, str]):
+        self._change(("record", source, dict(hashes)))
+
+    def forget(self, source: str, chunk_ids: Set[str]):
+        self._change(("forget", source, set(chunk_ids)))
+
+    def clear(self):
+        with self.lock:
+            self.sources = {}
+            # Earlier changes are moot once the saved file is wiped too
+            self.changes = [("clear",)]
+
+    def __len__(self) -> int:
+        with self.lock:
+            return sum(len(entries) for entries in self.sources.values())
+
+    def refresh(self):
+        """Pick up sources saved by other processes, keeping this process's unsaved changes"""
+        with self.lock:
+            self.sources = self._replay(self._load())
+
+    def save(self):
+        with file_lock(self.file_path), self.lock:
+            merged = self._replay(self._load())
+            tmp_path = self.file_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(merged, f)
+            os.replace(tmp_path, self.file_path)
+            self.sources = merged
+            self.changes = []
+
+    def _change(self, change: tuple):
+        with self.lock:
+            self._apply(self.sources, change)
+            self.changes.append(change)
+
+    def _replay(self, sources: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+        for change in self.changes:
+            sources = self._apply(sources, change)
+        return sources
+
+    @staticmethod
+    def _apply(sources: Dict[str, Dict[str, str]], change: tuple) -> Dict[str, Dict[str, str]]:
+        if change[0] == "clear":
+            sources.clear()
+        elif change[0] == "record":
+            sources.setdefault(change[1], {}).update(change[2])
+        else:
+            entries = sources.get(change[1], {})
+            for chunk_id in change[2]:
+                entries.pop(chunk_id, None)
+            if not entries:
+                sources.pop(change[1], None)
+        return sources
+
+    def _load(self) -> Dict[str, Dict[str, str]]:
+        if not os.path.exists(self.file_path):
+            return {}
+        with open(self.file_path) as f:
+            return json.load(f)
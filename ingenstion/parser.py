@@ -1,8 +1,12 @@
 import re
 import json
-from typing import List, Dict, Any
+import hashlib
+import zlib
+from typing import List, Dict, Any, Iterable, Iterator, AsyncIterator
 from dataclasses import dataclass
 
+from api.redaction import Redactor, get_redactor
+
 
 @dataclass
 class DocumentChunk:
@@ -10,59 +14,141 @@ class DocumentChunk:
     metadata: Dict[str, Any]
     doc_type: str
     chunk_id: str
+    content_hash: str = ""
+
+    def __post_init__(self):
+        if not self.content_hash:
+            self.content_hash = content_hash(self.content)
+
+
+def content_hash(content: str) -> str:
+    """Stable fingerprint of a chunk's text, independent of its position in the document"""
+    normalized = re.sub(r"\s+", " ", content).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def make_chunk_id(source: str, content: str) -> str:
+    """Content-addressed chunk id, so inserting a sentence does not shift every later id"""
+    return f"{source}_{content_hash(content)[:16]}"
+
+
+def is_boundary_sentence(sentence: str) -> bool:
+    """Deterministically mark roughly one sentence in four as a preferred chunk boundary"""
+    return zlib.crc32(sentence.encode("utf-8")) % 4 == 0
 
 
 class DocumentParser:
-    def __init__(self, chunk_size: int = 512, chunk_overlap: int = 50):
+    def __init__(self, chunk_size: int = 512, chunk_overlap: int = 50, redactor: Redactor = None):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        # Text is redacted before the sentence split, which would break e-mail addresses apart
+        self.redactor = redactor or get_redactor()
 
     def parse_text(self, text: str, doc_type: str, source: str = "upload") -> List[DocumentChunk]:
         """Parse plain text into chunks"""
-        chunks = []
-        sentences = re.split(r'[.!?]+', text)
+        return list(self.iter_chunks([text], doc_type, source))
 
-        current_chunk = ""
-        chunk_id = 0
+    def iter_chunks(self, blocks: Iterable[str], doc_type: str, source: str = "upload") -> Iterator[DocumentChunk]:
+        """Chunk text arriving in blocks, yielding each chunk as soon as it is complete"""
+        chunker = StreamingChunker(self, doc_type, source)
+        for block in blocks:
+            yield from chunker.feed(block)
+        yield from chunker.finish()
 
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-
-            if len(current_chunk) + len(sentence) <= self.chunk_size:
-                current_chunk += " " + sentence if current_chunk else sentence
-            else:
-                if current_chunk:
-                    chunks.append(DocumentChunk(
-                        content=current_chunk,
-                        metadata={
-                            "source": source,
-                            "chunk_id": chunk_id,
-                            "char_count": len(current_chunk)
-                        },
-                        doc_type=doc_type,
-                        chunk_id=f"{source}_{chunk_id}"
-                    ))
-                    chunk_id += 1
-
-                current_chunk = sentence
-
-        if current_chunk:
-            chunks.append(DocumentChunk(
-                content=current_chunk,
-                metadata={
-                    "source": source,
-                    "chunk_id": chunk_id,
-                    "char_count": len(current_chunk)
-                },
-                doc_type=doc_type,
-                chunk_id=f"{source}_{chunk_id}"
-            ))
+    async def aiter_chunks(self, blocks: AsyncIterator[str], doc_type: str,
+                           source: str = "upload") -> AsyncIterator[DocumentChunk]:
+        """Async variant of iter_chunks for streamed uploads"""
+        chunker = StreamingChunker(self, doc_type, source)
+        async for block in blocks:
+            for chunk in chunker.feed(block):
+                yield chunk
+        for chunk in chunker.finish():
+            yield chunk
 
-        return chunks
+    def _make_chunk(self, content: str, doc_type: str, source: str, chunk_id: int) -> DocumentChunk:
+        return DocumentChunk(
+            content=content,
+            metadata={
+                "source": source,
+                "chunk_id": chunk_id,
+                "char_count": len(content)
+            },
+            doc_type=doc_type,
+            chunk_id=make_chunk_id(source, content)
+        )
 
     def parse_pdf(self, file_path: str, doc_type: str = "pdf") -> List[DocumentChunk]:
         # TODO: Implement PDF parsing
         # For MVP, we'll handle text files and sample data
-        pass
\ No newline at end of file
+        pass
+
+
+class StreamingChunker:
+    """Incremental sentence chunker; holds at most one partial line, one partial sentence and one partial chunk"""
+
+    def __init__(self, parser: DocumentParser, doc_type: str, source: str):
+        self.parser = parser
+        self.doc_type = doc_type
+        self.source = source
+        self.raw = ""  # text after the last line break, not yet redacted
+        self.buffer = ""
+        self.current_chunk = ""
+        self.chunk_id = 0
+        # A run of text with no sentence terminator is flushed as a sentence past this size
+        self.max_buffer = parser.chunk_size * 16
+
+    def feed(self, text: str) -> List[DocumentChunk]:
+        return self._consume(text, final=False)
+
+    def finish(self) -> List[DocumentChunk]:
+        chunks = self._consume("", final=True)
+        chunks.extend(self._add_sentence(self.buffer))
+        self.buffer = ""
+        if self.current_chunk:
+            chunks.append(self._emit())
+        return chunks
+
+    def _consume(self, text: str, final: bool) -> List[DocumentChunk]:
+        # Redact whole lines only, so PII split across two blocks is still matched
+        self.raw += text
+        cut = len(self.raw) if final else self.raw.rfind("\n") + 1
+        if not cut and len(self.raw) > self.max_buffer:
+            cut = len(self.raw)
+        self.buffer += self.parser.redactor.redact(self.raw[:cut])
+        self.raw = self.raw[cut:]
+
+        sentences = re.split(r'[.!?]+', self.buffer)
+        # The last piece may be a sentence that continues in the next block
+        self.buffer = sentences.pop()
+        if len(self.buffer) > self.max_buffer:
+            sentences.append(self.buffer)
+            self.buffer = ""
+
+        chunks = []
+        for sentence in sentences:
+            chunks.extend(self._add_sentence(sentence))
+        return chunks
+
+    def _add_sentence(self, sentence: str) -> List[DocumentChunk]:
+        sentence = sentence.strip()
+        if not sentence:
+            return []
+
+        chunks = []
+        if len(self.current_chunk) + len(sentence) <= self.parser.chunk_size:
+            self.current_chunk += " " + sentence if self.current_chunk else sentence
+            # Content-defined cut: boundaries depend on the sentences themselves, so an
+            # edit early in a document only changes the chunks around it
+            if len(self.current_chunk) >= self.parser.chunk_size // 2 and is_boundary_sentence(sentence):
+                chunks.append(self._emit())
+        else:
+            if self.current_chunk:
+                chunks.append(self._emit())
+            self.current_chunk = sentence
+        return chunks
+
+    def _emit(self) -> DocumentChunk:
+        chunk = self.parser._make_chunk(self.current_chunk, self.doc_type, self.source, self.chunk_id)
+        self.chunk_id += 1
+        self.current_chunk = ""
+        return chunk
@@ -1,13 +1,26 @@
-import numpy as np
-from typing import Dict, Any
-import json
+from typing import Dict, Any, List
 import os
 
+from .matcher import KeywordMatcher
+from .linear_model import LinearTriageModel
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts", "triage_model.npz")
+
 
 class TriageClassifier:
-    def __init__(self):
-        # Simple rule-based classifier for MVP
-        # In production, this would be a fine-tuned transformer model
+    def __init__(self, mode: str = None, model_path: str = None):
+        # Rule-based by default; TRIAGE_MODE=model switches to the trained linear model
+        # produced by scripts/train_triage_model.py
+        self.mode = (mode or os.getenv("TRIAGE_MODE", "rules")).lower()
+        self.model = None
+        if self.mode == "model":
+            model_path = model_path or os.getenv("TRIAGE_MODEL_PATH", DEFAULT_MODEL_PATH)
+            if os.path.exists(model_path):
+                self.model = LinearTriageModel.load(model_path)
+            else:
+                print(f"Triage model not found at {model_path}; falling back to rules")
+                self.mode = "rules"
+
         self.rules = {
             "bot": [
                 "password reset", "forgot password", "business hours",
@@ -22,16 +35,17 @@ class TriageClassifier:
                 "emergency", "urgent", "critical"
             ]
         }
+        # Compiled once; finds every rule keyword in a single pass over the message
+        self.matcher = KeywordMatcher(self.rules)
 
     def classify(self, message: str) -> Dict[str, Any]:
+        if self.model is not None:
+            return self.model.classify(message)
+
         message_lower = message.lower()
 
         scores = {"bot": 0, "tier1": 0, "escalate": 0}
-
-        for category, keywords in self.rules.items():
-            for keyword in keywords:
-                if keyword in message_lower:
-                    scores[category] += 1
+        scores.update(self.matcher.count(message_lower))
 
         # Normalize scores
         total = sum(scores.values())
@@ -52,4 +66,10 @@ class TriageClassifier:
             "classification": classification,
             "confidence": confidence,
             "scores": scores
-        }
\ No newline at end of file
+        }
+
+    def classify_batch(self, messages: List[str]) -> List[Dict[str, Any]]:
+        """Classify many messages with the same compiled matcher or model"""
+        if self.model is not None:
+            return self.model.classify_batch(messages)
+        return [self.classify(message) for message in messages]
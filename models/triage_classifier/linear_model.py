@@ -0,0 +1,85 @@
+import math
+import re
+import zlib
+from typing import Dict, Any, List
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\b\w\w+\b")
+DEFAULT_N_FEATURES = 2 ** 18
+
+
+def extract_features(text: str, n_features: int = DEFAULT_N_FEATURES) -> Dict[int, float]:
+    """Hashed, L2-normalized unigram + bigram counts.
+
+    Used both for training and inference, so the model needs no fitted vocabulary and
+    no scikit-learn import at serving time.
+    """
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    counts = {}
+    for gram in grams:
+        index = zlib.crc32(gram.encode("utf-8")) % n_features
+        counts[index] = counts.get(index, 0.0) + 1.0
+
+    norm = math.sqrt(sum(v * v for v in counts.values()))
+    if norm:
+        for index in counts:
+            counts[index] /= norm
+    return counts
+
+
+class LinearTriageModel:
+    """Sparse linear classifier (logistic regression weights over hashed n-grams)"""
+
+    def __init__(self, labels: List[str], coef: np.ndarray, intercept: np.ndarray,
+                 n_features: int = DEFAULT_N_FEATURES):
+        self.labels = [str(label) for label in labels]
+        self.n_features = n_features
+        # Feature-major layout: one contiguous row of class weights per hashed feature
+        self.weights = np.ascontiguousarray(np.asarray(coef, dtype=np.float32).T)
+        self.intercept = np.asarray(intercept, dtype=np.float32)
+
+    @classmethod
+    def from_sklearn(cls, estimator, n_features: int = DEFAULT_N_FEATURES) -> "LinearTriageModel":
+        return cls(list(estimator.classes_), estimator.coef_, estimator.intercept_, n_features)
+
+    @classmethod
+    def load(cls, path: str) -> "LinearTriageModel":
+        data = np.load(path, allow_pickle=False)
+        return cls(list(data["labels"]), data["weights"].T, data["intercept"], int(data["n_features"]))
+
+    def save(self, path: str):
+        np.savez(path, labels=np.array(self.labels), weights=self.weights,
+                 intercept=self.intercept, n_features=np.array(self.n_features))
+
+    def predict_proba(self, message: str) -> Dict[str, float]:
+        features = extract_features(message, self.n_features)
+        logits = self.intercept.copy()
+        if features:
+            indices = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+            values = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+            logits += values @ self.weights[indices]
+        return dict(zip(self.labels, self._probabilities(logits)))
+
+    def classify(self, message: str) -> Dict[str, Any]:
+        """Same return shape as the rule-based TriageClassifier.classify"""
+        scores = self.predict_proba(message)
+        classification = max(scores.items(), key=lambda x: x[1])
+        return {
+            "classification": classification[0],
+            "confidence": classification[1],
+            "scores": scores
+        }
+
+    def classify_batch(self, messages: List[str]) -> List[Dict[str, Any]]:
+        return [self.classify(message) for message in messages]
+
+    def _probabilities(self, logits: np.ndarray) -> List[float]:
+        if len(logits) == 1:
+            # Binary logistic regression stores a single row of weights for the positive class
+            p = 1.0 / (1.0 + math.exp(-float(logits[0])))
+            return [1.0 - p, p]
+        exp = np.exp(logits - logits.max())
+        return (exp / exp.sum()).tolist()
@@ -0,0 +1,79 @@
+from collections import deque
+from typing import Dict, List, Set
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over all rule keywords.
+
+    Finds every keyword occurring in a text, including overlapping and nested ones
+    ("cancel subscription" also contains "cancel" and "subscription"), in a single pass
+    over the text regardless of how many keywords there are.
+    """
+
+    def __init__(self, rules: Dict[str, List[str]]):
+        self.keywords = []
+        self.keyword_categories = []
+        index = {}
+        for category, keywords in rules.items():
+            for keyword in keywords:
+                if keyword not in index:
+                    index[keyword] = len(self.keywords)
+                    self.keywords.append(keyword)
+                    self.keyword_categories.append([])
+                self.keyword_categories[index[keyword]].append(category)
+
+        self.categories = list(rules)
+        self._build()
+
+    def _build(self):
+        # Node 0 is the root; goto[node] maps a character to the next node
+        self.goto = [{}]
+        self.fail = [0]
+        outputs = [set()]
+
+        for keyword_id, keyword in enumerate(self.keywords):
+            node = 0
+            for char in keyword:
+                next_node = self.goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self.goto)
+                    self.goto[node][char] = next_node
+                    self.goto.append({})
+                    self.fail.append(0)
+                    outputs.append(set())
+                node = next_node
+            outputs[node].add(keyword_id)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(char, 0)
+                outputs[child] |= outputs[self.fail[child]]
+
+        self.outputs = [frozenset(o) for o in outputs]
+
+    def find(self, text: str) -> Set[int]:
+        """Ids of all keywords that occur in text"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        found = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if outputs[node]:
+                found |= outputs[node]
+        return found
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Number of distinct keywords of each category that occur in text"""
+        counts = {category: 0 for category in self.categories}
+        for keyword_id in self.find(text):
+            for category in self.keyword_categories[keyword_id]:
+                counts[category] += 1
+        return counts
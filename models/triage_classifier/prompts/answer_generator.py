@@ -1,8 +1,15 @@
-from typing import List, Dict
+import asyncio
+from typing import List, Dict, AsyncIterator
+
+from .backends import BatchingClient, TOKEN_PATTERN, client_from_env
 
 
 class AnswerGenerator:
-    def __init__(self):
+    def __init__(self, client: BatchingClient = None, answer_cache=None):
+        # None keeps the template responses; see backends.client_from_env for LLM_BACKEND
+        self.client = client if client is not None else client_from_env()
+        # Optional semantic cache (lookup/store by question embedding + context ids)
+        self.answer_cache = answer_cache
         self.prompts = {
             "answer": """
             Based on the following context information, provide a concise and helpful answer to the user's question.
@@ -39,15 +46,99 @@ class AnswerGenerator:
             """
         }
 
-    def generate_answer(self, question: str, context: List[str]) -> str:
+    async def generate_answer(self, question: str, context: List[str], embedding: List[float] = None,
+                              context_ids: List[str] = None) -> str:
+        """Answer from context; with an embedding and context ids the semantic cache is consulted first"""
+        use_cache = self.answer_cache is not None and embedding is not None and context_ids is not None
+        if use_cache:
+            cached = self.answer_cache.lookup(embedding, context_ids)
+            if cached is not None:
+                return cached
+
+        if self.client is None:
+            answer = self._template_answer(question)
+        else:
+            try:
+                answer = await self.client.complete(self._answer_prompt(question, context))
+            except Exception as e:
+                # Overload, timeout or backend error: degrade to the canned answer, uncached
+                print(f"LLM answer generation failed, using template: {e!r}")
+                return self._template_answer(question)
+
+        if use_cache:
+            self.answer_cache.store(question, embedding, context_ids, answer)
+        return answer
+
+    async def generate_suggested_reply(self, message: str, context: List[str]) -> str:
+        if self.client is None:
+            return self._template_reply(message)
+        try:
+            return await self.client.complete(self._reply_prompt(message, context))
+        except Exception as e:
+            print(f"LLM reply generation failed, using template: {e!r}")
+            return self._template_reply(message)
+
+    async def stream_answer(self, question: str, context: List[str], embedding: List[float] = None,
+                            context_ids: List[str] = None) -> AsyncIterator[str]:
+        """Yield the answer incrementally as the backend produces it.
+
+        Without a backend the template answer is split into word tokens. If the backend
+        fails before its first token the template is streamed instead; a failure after
+        that ends the answer where it stopped. Cache hits are replayed as tokens, and only
+        complete backend (or template-mode) answers are cached.
+        """
+        use_cache = self.answer_cache is not None and embedding is not None and context_ids is not None
+        if use_cache:
+            cached = self.answer_cache.lookup(embedding, context_ids)
+            if cached is not None:
+                for token in TOKEN_PATTERN.findall(cached):
+                    yield token
+                return
+
+        if self.client is not None:
+            tokens = []
+            try:
+                async for token in self.client.stream(self._answer_prompt(question, context)):
+                    tokens.append(token)
+                    yield token
+            except Exception as e:
+                print(f"LLM answer streaming failed: {e!r}")
+                if not tokens:
+                    for token in TOKEN_PATTERN.findall(self._template_answer(question)):
+                        yield token
+                return
+            if use_cache and tokens:
+                self.answer_cache.store(question, embedding, context_ids, "".join(tokens))
+            return
+
+        answer = self._template_answer(question)
+        for token in TOKEN_PATTERN.findall(answer):
+            yield token
+            # Hand control back to the event loop between tokens, as a network stream would
+            await asyncio.sleep(0)
+        if use_cache:
+            self.answer_cache.store(question, embedding, context_ids, answer)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+
+    def _answer_prompt(self, question: str, context: List[str]) -> str:
         context_text = "\n".join([f"- {c}" for c in context])
-        prompt = self.prompts["answer"].format(
+        return self.prompts["answer"].format(
             question=question,
             context=context_text
         )
 
-        # For MVP, using simple template-based responses
-        # In production, this would call an LLM API
+    def _reply_prompt(self, message: str, context: List[str]) -> str:
+        context_text = "\n".join([f"- {c}" for c in context])
+        return self.prompts["suggested_reply"].format(
+            message=message,
+            context=context_text
+        )
+
+    def _template_answer(self, question: str) -> str:
+        # Canned responses used when no LLM backend is configured or it is unavailable
         if any(word in question.lower() for word in ["password", "reset", "forgot"]):
             return "You can reset your password by clicking 'Forgot Password' on the login page and following the email instructions."
         elif any(word in question.lower() for word in ["billing", "invoice", "payment"]):
@@ -57,14 +148,7 @@ class AnswerGenerator:
         else:
             return "I understand you're looking for help. Our support team can assist you with this matter."
 
-    def generate_suggested_reply(self, message: str, context: List[str]) -> str:
-        context_text = "\n".join([f"- {c}" for c in context])
-        prompt = self.prompts["suggested_reply"].format(
-            message=message,
-            context=context_text
-        )
-
-        # Simple template-based response for MVP
+    def _template_reply(self, message: str) -> str:
         if any(word in message.lower() for word in ["thank", "appreciate", "great"]):
             return "You're welcome! I'm glad I could help. Let us know if you need anything else."
         elif any(word in message.lower() for word in ["problem", "issue", "help"]):
@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+from typing import List, Optional, AsyncIterator
+
+TOKEN_PATTERN = re.compile(r"\S+\s*")
+
+
+class LLMOverloadedError(Exception):
+    """Raised when a generation request cannot be queued; callers fall back to templates"""
+
+
+class LLMBackend:
+    """Text-completion backend. All methods are coroutines and must not block the event loop."""
+
+    async def complete(self, prompt: str) -> str:
+        return (await self.complete_batch([prompt]))[0]
+
+    async def complete_batch(self, prompts: List[str]) -> List[str]:
+        """Complete several prompts; backends with a native batch API override this"""
+        return list(await asyncio.gather(*(self.complete(prompt) for prompt in prompts)))
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the completion in pieces; backends without streaming yield it whole"""
+        yield await self.complete(prompt)
+
+    async def close(self):
+        pass
+
+
+class StubBackend(LLMBackend):
+    """Deterministic local backend for tests and demos: the same prompt always gives the same text"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.batches = []  # sizes of the batches received, for inspecting micro-batching
+
+    async def complete_batch(self, prompts):
+        self.batches.append(len(prompts))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._respond(prompt) for prompt in prompts]
+
+    async def stream(self, prompt):
+        for token in TOKEN_PATTERN.findall(self._respond(prompt)):
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            else:
+                await asyncio.sleep(0)
+            yield token
+
+    @staticmethod
+    def _respond(prompt: str) -> str:
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        return f"Stub response {digest} for a {len(prompt)}-character prompt."
+
+
+class OpenAIBackend(LLMBackend):
+    """Any OpenAI-compatible server (OpenAI, vLLM, llama.cpp, ...) over a pooled httpx.AsyncClient.
+
+    LLM_API=chat uses /chat/completions, one request per prompt over the shared connection pool.
+    LLM_API=completions uses /completions, which accepts a list of prompts, so a micro-batch
+    goes out as a single request.
+    """
+
+    def __init__(self, base_url: str = None, api_key: str = None, model: str = None, api: str = None):
+        import httpx
+
+        self.model = model or os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+        self.api = api or os.getenv("LLM_API", "chat")
+        self.max_tokens = int(os.getenv("LLM_MAX_TOKENS", "256"))
+        self.temperature = float(os.getenv("LLM_TEMPERATURE", "0.2"))
+        max_connections = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+        self.client = httpx.AsyncClient(
+            base_url=base_url or os.getenv("LLM_BASE_URL", "https://api.openai.com/v1"),
+            headers={"Authorization": f"Bearer {api_key or os.getenv('LLM_API_KEY', '')}"},
+            timeout=httpx.Timeout(float(os.getenv("LLM_TIMEOUT", "30")), connect=5.0),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    async def complete(self, prompt):
+        if self.api == "completions":
+            return (await self.complete_batch([prompt]))[0]
+        response = await self.client.post("/chat/completions", json=self._chat_body(prompt))
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"].strip()
+
+    async def complete_batch(self, prompts):
+        if self.api != "completions":
+            return await super().complete_batch(prompts)
+        response = await self.client.post("/completions", json={
+            "model": self.model,
+            "prompt": prompts,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature
+        })
+        response.raise_for_status()
+        texts = [""] * len(prompts)
+        for choice in response.json()["choices"]:
+            texts[choice["index"]] = choice["text"].strip()
+        return texts
+
+    async def stream(self, prompt):
+        if self.api == "completions":
+            body = {"model": self.model, "prompt": prompt, "max_tokens": self.max_tokens,
+                    "temperature": self.temperature, "stream": True}
+            path = "/completions"
+        else:
+            body = dict(self._chat_body(prompt), stream=True)
+            path = "/chat/completions"
+
+        async with self.client.stream("POST", path, json=body) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data.strip() == "[DONE]":
+                    break
+                choice = json.loads(data)["choices"][0]
+                text = choice["delta"].get("content") if "delta" in choice else choice.get("text")
+                if text:
+                    yield text
+
+    async def close(self):
+        await self.client.aclose()
+
+    def _chat_body(self, prompt: str):
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature
+        }
+
+
+class BatchingClient:
+    """Front for an LLMBackend that keeps throughput steady under bursts of requests.
+
+    - Concurrent `complete` calls arriving within `batch_window` seconds (up to
+      `max_batch_size`) are sent to the backend as one `complete_batch` call.
+    - At most `max_concurrency` batches or streams are in flight at once.
+    - When more than `max_pending` requests are waiting, new ones fail fast with
+      LLMOverloadedError instead of queueing behind a backlog they would time out in.
+    - Every request is bounded by `timeout` seconds end to end.
+    """
+
+    def __init__(self, backend: LLMBackend, max_batch_size: int = None, batch_window: float = None,
+                 max_concurrency: int = None, max_pending: int = None, timeout: float = None):
+        self.backend = backend
+        self.max_batch_size = max_batch_size or int(os.getenv("LLM_MAX_BATCH_SIZE", "8"))
+        self.batch_window = batch_window if batch_window is not None else \
+            float(os.getenv("LLM_BATCH_WINDOW_MS", "10")) / 1000
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+        self.max_pending = max_pending or int(os.getenv("LLM_MAX_PENDING", "256"))
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT", "30"))
+        self.pending = []  # (prompt, future) waiting for the next batch
+        self.in_flight = 0  # requests submitted and not yet answered
+        self.flush_handle = None
+        self.semaphore = None
+        self.tasks = set()
+
+    async def complete(self, prompt: str) -> str:
+        if self.in_flight >= self.max_pending:
+            raise LLMOverloadedError(f"{self.in_flight} generation requests already pending")
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((prompt, future))
+        self.in_flight += 1
+        try:
+            if len(self.pending) >= self.max_batch_size:
+                self._flush()
+            elif self.flush_handle is None:
+                self.flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+            # On timeout wait_for cancels the future, so its batch skips or ignores it
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self.in_flight -= 1
+
+    async def stream(self, prompt: str, first_token_timeout: float = None) -> AsyncIterator[str]:
+        """Stream one completion; only the wait for a slot and the first token are time-bounded"""
+        if self.in_flight >= self.max_pending:
+            raise LLMOverloadedError(f"{self.in_flight} generation requests already pending")
+
+        self.in_flight += 1
+        try:
+            await asyncio.wait_for(self._semaphore().acquire(), self.timeout)
+        except BaseException:
+            self.in_flight -= 1
+            raise
+        try:
+            tokens = self.backend.stream(prompt).__aiter__()
+            yield await asyncio.wait_for(tokens.__anext__(), first_token_timeout or self.timeout)
+            async for token in tokens:
+                yield token
+        except StopAsyncIteration:
+            return
+        finally:
+            self._semaphore().release()
+            self.in_flight -= 1
+
+    async def close(self):
+        await self.backend.close()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop, not the one at import time
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.semaphore
+
+    def _flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        while self.pending:
+            batch = self.pending[:self.max_batch_size]
+            self.pending = self.pending[self.max_batch_size:]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _run_batch(self, batch):
+        async with self._semaphore():
+            # Checked after the wait for a slot: requests that timed out while queued behind
+            # other batches are not worth a backend call
+            batch = [(prompt, future) for prompt, future in batch if not future.done()]
+            if not batch:
+                return
+            try:
+                texts = await self.backend.complete_batch([prompt for prompt, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        for (_, future), text in zip(batch, texts):
+            if not future.done():
+                future.set_result(text)
+
+
+def client_from_env() -> Optional[BatchingClient]:
+    """LLM_BACKEND=openai|stub selects a backend; unset or "template" keeps the canned replies"""
+    name = os.getenv("LLM_BACKEND", "template").lower()
+    if name == "openai":
+        return BatchingClient(OpenAIBackend())
+    if name == "stub":
+        return BatchingClient(StubBackend(latency=float(os.getenv("LLM_STUB_LATENCY", "0"))))
+    return None
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Report recall@k and latency of the IVF index against brute-force search
+for a collection stored in the NumPy vector backend.
+"""
+import argparse
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from api.ann_index import index_from_env, recall_report
+from api.vector_store import NumpyVectorStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("collection", help="Collection name, e.g. tickets")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled query vectors")
+    args = parser.parse_args()
+
+    store = NumpyVectorStore()
+    collection = store._collection(args.collection, create=False)
+    matrix = np.asarray(collection.matrix)
+    print(f"Collection '{args.collection}': {matrix.shape[0]} vectors, dim {matrix.shape[1]}")
+
+    index = collection.index
+    if index is None:
+        print("No persisted index; training one for this report...")
+        index = index_from_env()
+        index.train(matrix)
+
+    # Perturbed stored vectors stand in for real queries
+    rng = np.random.default_rng(0)
+    rows = rng.choice(matrix.shape[0], min(args.queries, matrix.shape[0]), replace=False)
+    queries = matrix[rows] + rng.normal(scale=0.05, size=(len(rows), matrix.shape[1])).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    print(f"{'n_probe':>8} {'recall@' + str(args.k):>10} {'ann ms':>8} {'brute ms':>9}")
+    for row in recall_report(matrix, index, queries, k=args.k):
+        print(f"{row['n_probe']:>8} {row['recall_at_k']:>10.3f} {row['ann_ms']:>8.2f} {row['brute_force_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Train the linear triage model from labeled rows in the tickets table.
+
+Writes a .npz artifact loaded by TriageClassifier when TRIAGE_MODE=model.
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+from api.ticket_manager import TicketManager
+from models.triage_classifier.classifier import DEFAULT_MODEL_PATH
+from models.triage_classifier.linear_model import LinearTriageModel, extract_features, DEFAULT_N_FEATURES
+
+
+def load_labeled_tickets():
+    rows = TicketManager().labeled_messages()
+    return [row[0] for row in rows], [row[1] for row in rows]
+
+
+def featurize(messages, n_features):
+    data, indices, indptr = [], [], [0]
+    for message in messages:
+        features = extract_features(message, n_features)
+        indices.extend(features.keys())
+        data.extend(features.values())
+        indptr.append(len(indices))
+    return csr_matrix((data, indices, indptr), shape=(len(messages), n_features), dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--n-features", type=int, default=DEFAULT_N_FEATURES)
+    parser.add_argument("--C", type=float, default=4.0, help="Inverse regularization strength")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    args = parser.parse_args()
+
+    print("Loading labeled tickets...")
+    messages, labels = load_labeled_tickets()
+    if len(set(labels)) < 2:
+        print("❌ Need labeled tickets from at least two classes to train.")
+        sys.exit(1)
+    print(f"Loaded {len(messages)} tickets: " +
+          ", ".join(f"{label}={labels.count(label)}" for label in sorted(set(labels))))
+
+    X = featurize(messages, args.n_features)
+    y = np.array(labels)
+
+    if args.test_size > 0 and len(messages) >= 20:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=args.test_size, random_state=0)
+        estimator = LogisticRegression(C=args.C, max_iter=1000).fit(X_train, y_train)
+        print(f"Held-out accuracy: {estimator.score(X_test, y_test):.3f}")
+
+    # Final model uses every labeled row
+    estimator = LogisticRegression(C=args.C, max_iter=1000).fit(X, y)
+    model = LinearTriageModel.from_sklearn(estimator, args.n_features)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    model.save(args.output)
+
+    start = time.perf_counter()
+    LinearTriageModel.load(args.output)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for message in messages[:1000]:
+        model.classify(message)
+    per_message_ms = (time.perf_counter() - start) * 1000 / min(len(messages), 1000)
+
+    print(f"✅ Saved model to {args.output} (load {load_ms:.1f} ms, {per_message_ms:.3f} ms/message)")
+
+
+if __name__ == "__main__":
+    main()
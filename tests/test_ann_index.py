@@ -0,0 +1,71 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.ann_index import IVFIndex, recall_report
+
+
+def unit_vectors(count, dimensions=16, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def all_rows(index):
+    return np.sort(np.concatenate(index.lists))
+
+
+def test_every_row_is_in_exactly_one_list():
+    vectors = unit_vectors(500)
+    index = IVFIndex(n_lists=16, n_probe=4)
+    index.train(vectors)
+    index.add(unit_vectors(50, seed=1), start_row=500)
+
+    np.testing.assert_array_equal(all_rows(index), np.arange(550))
+
+
+def test_probing_every_list_is_exact():
+    vectors = unit_vectors(500)
+    index = IVFIndex(n_lists=16, n_probe=4)
+    index.train(vectors)
+
+    report = recall_report(vectors, index, unit_vectors(20, seed=2), k=10, n_probes=[16])
+    assert report[0]["recall_at_k"] == 1.0
+
+
+def test_update_moves_rows_to_their_new_list():
+    vectors = unit_vectors(300)
+    index = IVFIndex(n_lists=8, n_probe=1)
+    index.train(vectors)
+
+    # Row 0 now points at row 1's centroid, so probing one list for it must find it
+    vectors[0] = vectors[1]
+    index.update(vectors[[0]], np.array([0]))
+
+    np.testing.assert_array_equal(all_rows(index), np.arange(300))
+    assert 0 in index.candidates(vectors[1], n_probe=1)
+
+
+def test_remove_renumbers_survivors():
+    vectors = unit_vectors(100)
+    index = IVFIndex(n_lists=4)
+    index.train(vectors)
+    keep = np.ones(100, dtype=bool)
+    keep[::3] = False
+
+    index.remove(keep)
+
+    np.testing.assert_array_equal(all_rows(index), np.arange(keep.sum()))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = IVFIndex(n_lists=8, n_probe=2)
+    index.train(unit_vectors(200))
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+
+    loaded = IVFIndex.load(path)
+    query = unit_vectors(1, seed=3)[0]
+    np.testing.assert_array_equal(loaded.candidates(query), index.candidates(query))
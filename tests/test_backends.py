@@ -0,0 +1,58 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.triage_classifier.prompts.backends import BatchingClient, LLMOverloadedError, StubBackend
+
+
+def test_concurrent_requests_are_micro_batched():
+    async def main():
+        backend = StubBackend()
+        client = BatchingClient(backend, max_batch_size=4, batch_window=0.01)
+        prompts = [f"prompt {i}" for i in range(10)]
+        answers = await asyncio.gather(*(client.complete(prompt) for prompt in prompts))
+        return backend, prompts, answers
+
+    backend, prompts, answers = asyncio.run(main())
+
+    assert answers == [StubBackend._respond(prompt) for prompt in prompts]
+    assert backend.batches == [4, 4, 2]
+
+
+def test_timed_out_requests_are_not_sent_to_the_backend():
+    async def main():
+        backend = StubBackend(latency=0.2)
+        client = BatchingClient(backend, max_batch_size=1, batch_window=0, max_concurrency=1, timeout=0.1)
+        outcomes = await asyncio.gather(*(client.complete(f"p{i}") for i in range(4)), return_exceptions=True)
+        # Let the batches that were queued behind the first one run (and skip)
+        await asyncio.sleep(0.3)
+        return backend, outcomes
+
+    backend, outcomes = asyncio.run(main())
+
+    assert all(isinstance(outcome, asyncio.TimeoutError) for outcome in outcomes)
+    assert backend.batches == [1]
+
+
+def test_rejects_requests_beyond_max_pending():
+    async def main():
+        client = BatchingClient(StubBackend(latency=0.05), max_batch_size=8, batch_window=0.01, max_pending=2)
+        return await asyncio.gather(*(client.complete(f"p{i}") for i in range(3)), return_exceptions=True)
+
+    outcomes = asyncio.run(main())
+
+    assert isinstance(outcomes[2], LLMOverloadedError)
+    assert all(isinstance(outcome, str) for outcome in outcomes[:2])
+
+
+def test_stream_yields_the_whole_completion():
+    async def main():
+        client = BatchingClient(StubBackend())
+        return [token async for token in client.stream("hello")]
+
+    tokens = asyncio.run(main())
+
+    assert "".join(tokens) == StubBackend._respond("hello")
+    assert len(tokens) > 1
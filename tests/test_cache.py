@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.cache import InMemoryCache, QueryCache
+
+
+def test_evicts_least_recently_used_entry():
+    cache = InMemoryCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expires_entries_after_their_ttl():
+    cache = InMemoryCache(default_ttl=0.05)
+    cache.set("short", "x")
+    cache.set("forever", "y", ttl=0)
+
+    time.sleep(0.1)
+
+    assert cache.get("short") is None
+    assert cache.get("forever") == "y"
+    assert cache.stats()["entries"] == 1
+
+
+def test_keeps_within_the_byte_budget():
+    value = "x" * 1000
+    cache = InMemoryCache(max_entries=100, max_bytes=3500)
+    for i in range(10):
+        cache.set(f"k{i}", value)
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 3500
+    assert stats["entries"] == 3
+    assert cache.get("k9") == value and cache.get("k0") is None
+
+    # A value larger than the whole budget is not cached at all
+    cache.set("huge", "x" * 5000)
+    assert cache.get("huge") is None and cache.get("k9") == value
+
+
+def test_overwriting_a_key_does_not_leak_bytes():
+    cache = InMemoryCache()
+    cache.set("k", "x" * 100)
+    size = cache.stats()["bytes"]
+    cache.set("k", "x" * 100)
+
+    assert cache.stats()["bytes"] == size
+
+
+def test_invalidating_a_collection_bypasses_its_cached_results():
+    cache = QueryCache(InMemoryCache())
+    cache.set_results("How do I reset?", "faq", 3, {"sources": ["a"]})
+    cache.set_results("How do I reset?", "tickets", 3, {"sources": ["b"]})
+
+    # Normalized queries share entries
+    assert cache.get_results("how do i   reset", "faq", 3) == {"sources": ["a"]}
+    assert cache.get_results("How do I reset?", "faq", 5) is None
+
+    cache.invalidate_collection("faq")
+
+    assert cache.get_results("How do I reset?", "faq", 3) is None
+    assert cache.get_results("How do I reset?", "tickets", 3) == {"sources": ["b"]}
+    stats = cache.stats()
+    assert stats["results_hits"] == 2 and stats["results_misses"] == 2
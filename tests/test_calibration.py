@@ -0,0 +1,60 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.calibration import ConfidenceCalibrator, MIN_OBSERVATIONS, distance_to_similarity, similarity_to_distance
+
+
+@pytest.mark.parametrize("metric,distance,similarity", [
+    ("l2", 0.0, 1.0), ("l2", 2.0, 0.0), ("l2", 0.5, 0.75),
+    ("cosine", 0.0, 1.0), ("cosine", 0.25, 0.75),
+    ("ip", 0.25, 0.75)
+])
+def test_distance_to_similarity(metric, distance, similarity):
+    assert distance_to_similarity(distance, metric) == pytest.approx(similarity)
+    assert similarity_to_distance(similarity, metric) == pytest.approx(distance)
+
+
+def test_uncalibrated_collection_uses_raw_similarity(tmp_path):
+    calibrator = ConfidenceCalibrator(path=str(tmp_path / "calibration.json"))
+    calibrator.observe("faq", [0.9] * (MIN_OBSERVATIONS - 1))
+
+    assert calibrator.confidence("faq", 0.2, "cosine") == pytest.approx(0.8)
+    assert calibrator.confidence("faq", 3.0, "l2") == 0.0
+    assert calibrator.confidence("faq", None, "cosine") == 0.5
+
+
+def test_confidences_are_comparable_across_dense_and_sparse_collections(tmp_path):
+    calibrator = ConfidenceCalibrator(path=str(tmp_path / "calibration.json"))
+    rng = random.Random(0)
+    calibrator.observe("dense", [rng.gauss(0.9, 0.02) for _ in range(200)])
+    calibrator.observe("sparse", [rng.gauss(0.5, 0.1) for _ in range(200)])
+
+    stats = calibrator.describe()
+    assert stats["dense"]["mean"] == pytest.approx(0.9, abs=0.01)
+    assert stats["sparse"]["std"] == pytest.approx(0.1, abs=0.02)
+
+    # A typical neighbour scores about 0.5 in either collection
+    assert calibrator.confidence("dense", 0.1, "cosine") == pytest.approx(0.5, abs=0.1)
+    assert calibrator.confidence("sparse", 0.5, "cosine") == pytest.approx(0.5, abs=0.1)
+    # A raw similarity of 0.8 is mediocre in the dense collection but strong in the sparse one
+    assert calibrator.confidence("dense", 0.2, "cosine") < 0.1
+    assert calibrator.confidence("sparse", 0.2, "cosine") > 0.9
+
+
+def test_save_load_and_reset(tmp_path):
+    path = str(tmp_path / "calibration.json")
+    calibrator = ConfidenceCalibrator(path=path)
+    calibrator.observe("faq", [0.8, 0.9, 1.0])
+    calibrator.save()
+
+    reloaded = ConfidenceCalibrator(path=path)
+    assert reloaded.describe()["faq"]["count"] == 3
+    assert reloaded.describe()["faq"]["mean"] == pytest.approx(0.9)
+
+    reloaded.reset("faq")
+    assert reloaded.describe() == {}
@@ -0,0 +1,67 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.context_packer import ContextPacker, CHUNK_OVERHEAD_TOKENS
+from ingenstion.parser import DocumentParser
+
+
+def word_count(text):
+    return len(text.split())
+
+
+def make_packer(**kwargs):
+    packer = ContextPacker(**kwargs)
+    # Deterministic counts whether or not tiktoken is installed
+    packer.count_tokens = word_count
+    return packer
+
+
+def source(content, source_id):
+    return {"id": source_id, "content": content, "source": "test", "confidence": 0.9}
+
+
+def test_packs_in_relevance_order_within_budget():
+    packer = make_packer(token_budget=110, min_chunk_tokens=5)
+    sources = [source(" ".join(f"w{i}_{j}" for j in range(30)), f"s{i}") for i in range(5)]
+
+    packed = packer.pack(sources)
+
+    assert [s["id"] for s in packed["sources"]] == ["s0", "s1", "s2", "s3"]
+    assert packed["tokens_used"] == 110
+    assert packed["sources"][-1]["truncated"]
+
+
+def test_drops_near_duplicates():
+    packer = make_packer(token_budget=1000)
+    text = "reset your password from the account settings page and confirm by email"
+    packed = packer.pack([source(text, "a"), source(text + " today", "b"), source("billing runs monthly", "c")])
+
+    assert [s["id"] for s in packed["sources"]] == ["a", "c"]
+    assert packed["dropped_duplicates"] == 1
+
+
+def test_truncates_at_sentence_boundary():
+    packer = make_packer(token_budget=1000)
+    content, tokens = packer._truncate("One two three. Four five six. Seven eight nine.", 7)
+
+    assert content == "One two three. Four five six."
+    assert tokens == 6
+
+
+def test_truncates_parser_chunks_at_word_boundary():
+    # The parser drops sentence terminators, so its chunks must fall back to whole words
+    text = " ".join(f"Sentence number {i} explains one more step of the setup." for i in range(40))
+    chunks = DocumentParser(chunk_size=512).parse_text(text, "faq")
+    chunk = max(chunks, key=lambda c: len(c.content)).content
+    budget = word_count(chunk) // 2 + CHUNK_OVERHEAD_TOKENS
+    packer = make_packer(token_budget=budget, min_chunk_tokens=8)
+
+    packed = packer.pack([source(chunk, "chunk")])
+
+    assert len(packed["sources"]) == 1
+    packed_source = packed["sources"][0]
+    assert packed_source["truncated"]
+    assert packed_source["tokens"] == budget - CHUNK_OVERHEAD_TOKENS
+    assert chunk.startswith(packed_source["content"] + " ")
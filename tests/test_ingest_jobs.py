@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("aiofiles")
+
+from api.ingest_jobs import IngestionQueue, JobStore
+
+
+class CountingParser:
+    async def aiter_chunks(self, blocks, doc_type, source):
+        async for block in blocks:
+            yield block
+
+
+class RecordingEmbedder:
+    def __init__(self):
+        self.ingested = []
+
+    async def ingest_stream(self, chunks, collection_name, progress_callback=None):
+        text = "".join([chunk async for chunk in chunks])
+        self.ingested.append((collection_name, text))
+        return {"chunks": 1, "skipped": 0, "chunks_per_sec": 1.0}
+
+
+def make_queue(tmp_path, store, embedder, monkeypatch):
+    monkeypatch.setenv("INGEST_SPOOL_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setenv("INGEST_JOB_STALE_SECONDS", "0.2")
+    monkeypatch.setenv("INGEST_JOB_SWEEP_SECONDS", "0.05")
+    return IngestionQueue(CountingParser(), embedder, store)
+
+
+def spooled_job(tmp_path, store, job_id, status):
+    os.makedirs(tmp_path / "uploads", exist_ok=True)
+    spool_path = str(tmp_path / "uploads" / job_id)
+    with open(spool_path, "w") as f:
+        f.write("hello")
+    store.create(job_id, "notes.txt", "faq", spool_path)
+    if status == "running":
+        assert store.claim(job_id)
+    return spool_path
+
+
+def test_quick_restart_takes_back_its_running_job(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    # Claimed by a process that was restarted before its heartbeat went stale
+    spool_path = spooled_job(tmp_path, store, "job1", "running")
+    embedder = RecordingEmbedder()
+    queue = make_queue(tmp_path, store, embedder, monkeypatch)
+
+    async def main():
+        await queue.start()
+        assert embedder.ingested == []
+        for _ in range(40):
+            await asyncio.sleep(0.05)
+            if store.get("job1")["status"] == "completed":
+                break
+        await queue.stop()
+
+    asyncio.run(main())
+
+    assert store.get("job1")["status"] == "completed"
+    assert embedder.ingested == [("faq", "hello")]
+    assert not os.path.exists(spool_path)
+
+
+def test_claims_are_exclusive(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    spooled_job(tmp_path, store, "job1", "queued")
+
+    assert store.claim("job1")
+    assert not store.claim("job1")
+
+
+def test_heartbeat_keeps_a_slow_job_from_being_requeued(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    spooled_job(tmp_path, store, "job1", "queued")
+
+    class SlowEmbedder(RecordingEmbedder):
+        async def ingest_stream(self, chunks, collection_name, progress_callback=None):
+            await asyncio.sleep(0.6)
+            return await super().ingest_stream(chunks, collection_name, progress_callback)
+
+    embedder = SlowEmbedder()
+    queue = make_queue(tmp_path, store, embedder, monkeypatch)
+
+    async def main():
+        await queue.start()
+        await asyncio.sleep(1.0)
+        await queue.stop()
+
+    asyncio.run(main())
+
+    assert store.get("job1")["status"] == "completed"
+    assert len(embedder.ingested) == 1
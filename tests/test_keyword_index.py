@@ -0,0 +1,87 @@
+import math
+import os
+import random
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.keyword_index import InvertedIndex, KeywordIndex, tokenize
+
+
+def bm25(documents, query, k1=1.2, b=0.75):
+    """Reference BM25 over a {id: text} dict, scoring every document from scratch"""
+    terms = {doc_id: Counter(tokenize(text)) for doc_id, text in documents.items()}
+    average_length = sum(sum(t.values()) for t in terms.values()) / len(terms)
+    scores = {}
+    for term in set(tokenize(query)):
+        containing = [doc_id for doc_id, t in terms.items() if term in t]
+        if not containing:
+            continue
+        idf = math.log(1 + (len(terms) - len(containing) + 0.5) / (len(containing) + 0.5))
+        for doc_id in containing:
+            tf = terms[doc_id][term]
+            norm = k1 * (1 - b + b * sum(terms[doc_id].values()) / average_length)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+    return scores
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    assert tokenize("Error ERR-1042 in v2.4") == ["error", "err-1042", "err", "1042", "in", "v2.4", "v2", "4"]
+
+
+def test_scores_match_reference_bm25_under_churn():
+    rng = random.Random(0)
+    words = ["refund", "invoice", "crash", "login", "password", "err-1042", "billing", "the", "app"]
+    index = InvertedIndex()
+    documents = {}
+
+    for step in range(300):
+        doc_id = f"d{rng.randrange(40)}"
+        if doc_id in documents and rng.random() < 0.3:
+            index.delete([doc_id])
+            del documents[doc_id]
+        else:
+            text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 10)))
+            index.add([doc_id], [text])
+            documents[doc_id] = text
+
+        if documents and step % 10 == 0:
+            query = " ".join(rng.sample(words, 2))
+            expected = bm25(documents, query)
+            results = dict(index.search(query, k=len(documents)))
+            assert results.keys() == expected.keys()
+            for doc_id, score in expected.items():
+                assert results[doc_id] == pytest.approx(score)
+
+    # Deleted slots are recycled rather than appended
+    assert len(index.slot_ids) <= 40
+
+
+def test_flush_and_reload(tmp_path):
+    index = KeywordIndex(path=str(tmp_path))
+    index.add("faq", ["a", "b"], ["reset your password", "refund policy for invoices"])
+    index.flush("faq")
+
+    reloaded = KeywordIndex(path=str(tmp_path))
+    assert reloaded.count("faq") == 2
+    assert reloaded.search("faq", "refund")[0][0] == "b"
+
+
+def test_flushes_from_several_workers_are_merged(tmp_path):
+    worker_a = KeywordIndex(path=str(tmp_path))
+    worker_b = KeywordIndex(path=str(tmp_path))
+    worker_a.add("faq", ["a", "old"], ["reset your password", "legacy portal login"])
+    worker_a.flush("faq")
+    worker_b.add("faq", ["b"], ["refund policy for invoices"])
+    worker_b.delete("faq", ["old"])
+    worker_b.flush("faq")
+
+    reloaded = KeywordIndex(path=str(tmp_path))
+    assert reloaded.count("faq") == 2
+    assert reloaded.search("faq", "password")[0][0] == "a"
+    assert reloaded.search("faq", "portal") == []
+    # The flushing worker adopts the merged index
+    assert worker_b.search("faq", "password")[0][0] == "a"
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.triage_classifier.linear_model import LinearTriageModel, extract_features
+
+sparse = pytest.importorskip("scipy.sparse")
+linear_model = pytest.importorskip("sklearn.linear_model")
+
+N_FEATURES = 2 ** 12
+
+MESSAGES = {
+    "bot": ["how to change my email", "what is the business hours", "where is the settings page",
+            "forgot password link", "how to export data"],
+    "tier1": ["billing question about my invoice", "refund for the last payment", "update my account plan",
+              "cancel my subscription please", "payment failed on card"],
+    "escalate": ["app crash on startup", "critical error in production", "checkout is broken",
+                 "urgent bug data lost", "login not working at all"]
+}
+
+
+def featurize(messages):
+    data, indices, indptr = [], [], [0]
+    for message in messages:
+        features = extract_features(message, N_FEATURES)
+        indices.extend(features.keys())
+        data.extend(features.values())
+        indptr.append(len(indices))
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(messages), N_FEATURES), dtype=np.float64)
+
+
+def fit(labels):
+    messages = [m for label in labels for m in MESSAGES[label]]
+    y = [label for label in labels for _ in MESSAGES[label]]
+    estimator = linear_model.LogisticRegression(C=4.0, max_iter=1000).fit(featurize(messages), y)
+    return estimator, LinearTriageModel.from_sklearn(estimator, N_FEATURES)
+
+
+QUERIES = ["my invoice is wrong", "the app keeps crashing", "how to reset", "", "totally unrelated words"]
+
+
+@pytest.mark.parametrize("labels", [["bot", "tier1", "escalate"], ["bot", "escalate"]])
+def test_probabilities_match_sklearn(labels):
+    estimator, model = fit(labels)
+    expected = estimator.predict_proba(featurize(QUERIES))
+
+    for query, row in zip(QUERIES, expected):
+        scores = model.predict_proba(query)
+        assert list(scores) == list(estimator.classes_)
+        np.testing.assert_allclose([scores[label] for label in estimator.classes_], row, atol=1e-5)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    _, model = fit(["bot", "tier1", "escalate"])
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    loaded = LinearTriageModel.load(path)
+
+    for query in QUERIES:
+        assert loaded.classify(query)["classification"] == model.classify(query)["classification"]
+        np.testing.assert_allclose(list(loaded.predict_proba(query).values()),
+                                   list(model.predict_proba(query).values()), atol=1e-6)
@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingenstion.manifest import IngestManifest
+
+
+def saved(tmp_path, collection="faq"):
+    with open(tmp_path / f"{collection}.json") as f:
+        return json.load(f)
+
+
+def test_workers_saving_the_same_collection_keep_each_others_sources(tmp_path):
+    worker_a = IngestManifest("faq", str(tmp_path))
+    worker_b = IngestManifest("faq", str(tmp_path))
+
+    worker_a.record("a.txt", {"a1": "h1", "a2": "h2"})
+    worker_a.save()
+    worker_b.record("b.txt", {"b1": "h3"})
+    worker_b.save()
+
+    assert saved(tmp_path) == {"a.txt": {"a1": "h1", "a2": "h2"}, "b.txt": {"b1": "h3"}}
+    # The saving worker now sees the other's sources too
+    assert worker_b.known_ids("a.txt") == {"a1", "a2"}
+
+
+def test_refresh_keeps_unsaved_changes(tmp_path):
+    worker_a = IngestManifest("faq", str(tmp_path))
+    worker_b = IngestManifest("faq", str(tmp_path))
+    worker_a.record("a.txt", {"a1": "h1"})
+    worker_a.save()
+
+    worker_b.record("b.txt", {"b1": "h2"})
+    worker_b.refresh()
+
+    assert worker_b.source_names() == ["a.txt", "b.txt"]
+    assert len(worker_b) == 2
+
+
+def test_forget_and_clear_are_replayed_onto_the_saved_file(tmp_path):
+    worker_a = IngestManifest("faq", str(tmp_path))
+    worker_a.record("a.txt", {"a1": "h1", "a2": "h2"})
+    worker_a.save()
+
+    worker_b = IngestManifest("faq", str(tmp_path))
+    worker_b.forget("a.txt", {"a1"})
+    worker_a.record("c.txt", {"c1": "h3"})
+    worker_a.save()
+    worker_b.save()
+    assert saved(tmp_path) == {"a.txt": {"a2": "h2"}, "c.txt": {"c1": "h3"}}
+
+    worker_a.clear()
+    worker_a.record("d.txt", {"d1": "h4"})
+    worker_a.save()
+    assert saved(tmp_path) == {"d.txt": {"d1": "h4"}}
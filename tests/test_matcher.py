@@ -0,0 +1,46 @@
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.triage_classifier.classifier import TriageClassifier
+from models.triage_classifier.matcher import KeywordMatcher
+
+
+def substring_counts(rules, text):
+    """The original rule loop: one `in` check per keyword"""
+    return {category: sum(1 for keyword in keywords if keyword in text) for category, keywords in rules.items()}
+
+
+def test_matches_substring_loop_on_random_text():
+    rng = random.Random(0)
+    alphabet = "abc "
+    rules = {
+        "x": ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(8)],
+        "y": ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(8)]
+    }
+    # Shared keywords count for every category that lists them
+    rules["y"].append(rules["x"][0])
+    matcher = KeywordMatcher(rules)
+
+    for _ in range(2000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        assert matcher.count(text) == substring_counts(rules, text), text
+
+
+def test_matches_substring_loop_on_triage_rules():
+    rules = TriageClassifier(mode="rules").rules
+    matcher = KeywordMatcher(rules)
+    vocabulary = [keyword for keywords in rules.values() for keyword in keywords] + ["the", "my", "app", "is"]
+    rng = random.Random(1)
+
+    for _ in range(500):
+        text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(0, 12)))
+        assert matcher.count(text) == substring_counts(rules, text), text
+
+
+def test_finds_overlapping_and_nested_keywords():
+    matcher = KeywordMatcher({"bot": ["cancel subscription"], "tier1": ["cancel", "subscription", "scrip"]})
+
+    assert matcher.count("please cancel subscription") == {"bot": 1, "tier1": 3}
@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.redaction import Redactor, DEFAULT_RULES_PATH
+from ingenstion.parser import DocumentParser
+
+TEXT = ("Contact jane.doe@acme.co.uk about the refund. "
+        "The card 4111 1111 1111 1111 was charged twice! Call 555-123-4567 today.")
+
+
+def write_rules(path, patterns, mtime_ns=None):
+    with open(path, "w") as f:
+        json.dump({"patterns": patterns, "replacement": "[REDACTED]"}, f)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_masks_every_rule_in_one_pass():
+    redacted = Redactor(path=DEFAULT_RULES_PATH).redact(TEXT)
+
+    assert "jane.doe" not in redacted
+    assert "4111" not in redacted
+    assert "555-123-4567" not in redacted
+    assert redacted.count("[REDACTED]") == 3
+
+
+def test_ingested_chunks_never_contain_dotted_emails():
+    parser = DocumentParser(redactor=Redactor(path=DEFAULT_RULES_PATH))
+    content = " ".join(chunk.content for chunk in parser.parse_text(TEXT, "faq"))
+
+    assert "jane" not in content and "acme" not in content
+    assert "4111" not in content
+    assert "[REDACTED]" in content
+
+
+def test_streamed_blocks_split_inside_an_email_are_redacted():
+    parser = DocumentParser(redactor=Redactor(path=DEFAULT_RULES_PATH))
+    text = TEXT + "\n" + TEXT
+    split = text.index("acme") + 2
+    blocks = [text[:split], text[split:split + 7], text[split + 7:]]
+
+    content = " ".join(chunk.content for chunk in parser.iter_chunks(blocks, "faq"))
+
+    assert "acme" not in content and "4111" not in content
+
+
+def test_reloads_rules_when_the_file_changes(tmp_path):
+    path = str(tmp_path / "rules.json")
+    write_rules(path, [{"name": "ticket", "pattern": r"TKT-\d+"}], mtime_ns=1_000_000_000)
+    redactor = Redactor(path=path, reload_interval=0)
+    assert redactor.redact("see TKT-42 and ORD-7") == "see [REDACTED] and ORD-7"
+
+    write_rules(path, [{"name": "order", "pattern": r"ORD-\d+", "replacement": "<order>"}], mtime_ns=2_000_000_000)
+    assert redactor.redact("see TKT-42 and ORD-7") == "see TKT-42 and <order>"
+
+
+def test_broken_edit_keeps_previous_rules(tmp_path):
+    path = str(tmp_path / "rules.json")
+    write_rules(path, [{"name": "ticket", "pattern": r"TKT-\d+"}], mtime_ns=1_000_000_000)
+    redactor = Redactor(path=path, reload_interval=0)
+
+    write_rules(path, [{"name": "broken", "pattern": "("}], mtime_ns=2_000_000_000)
+
+    assert redactor.redact_batch(["TKT-1", "", "none"]) == ["[REDACTED]", "", "none"]
@@ -0,0 +1,49 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.semantic_cache import SemanticAnswerCache
+
+
+def test_hits_near_duplicate_question_with_same_context():
+    cache = SemanticAnswerCache(max_entries=4, threshold=0.95)
+    cache.store("how do I reset my password", [1.0, 0.0, 0.0], ["c1", "c2"], "Use the reset link.")
+
+    assert cache.lookup([0.99, 0.05, 0.0], ["c1", "c2"]) == "Use the reset link."
+    assert cache.lookup([0.0, 1.0, 0.0], ["c1", "c2"]) is None
+    assert cache.lookup([1.0, 0.0, 0.0], ["c1", "c3"]) is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_invalidating_a_chunk_drops_answers_built_from_it():
+    cache = SemanticAnswerCache(max_entries=4)
+    cache.store("q1", [1.0, 0.0], ["c1"], "a1")
+    cache.store("q2", [0.0, 1.0], ["c2"], "a2")
+
+    cache.invalidate_chunks(["c1"])
+
+    assert cache.lookup([1.0, 0.0], ["c1"]) is None
+    assert cache.lookup([0.0, 1.0], ["c2"]) == "a2"
+    assert cache.stats()["entries"] == 1
+
+
+def test_evicts_least_recently_used():
+    cache = SemanticAnswerCache(max_entries=2)
+    cache.store("q1", [1.0, 0.0, 0.0], ["c"], "a1")
+    cache.store("q2", [0.0, 1.0, 0.0], ["c"], "a2")
+    assert cache.lookup([1.0, 0.0, 0.0], ["c"]) == "a1"
+
+    cache.store("q3", [0.0, 0.0, 1.0], ["c"], "a3")
+
+    assert cache.lookup([0.0, 1.0, 0.0], ["c"]) is None
+    assert cache.lookup([1.0, 0.0, 0.0], ["c"]) == "a1"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entries_miss():
+    cache = SemanticAnswerCache(max_entries=2, ttl=-1)
+    cache.store("q", [1.0, 0.0], ["c"], "a")
+
+    assert cache.lookup([1.0, 0.0], ["c"]) is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,26 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("psycopg2")
+
+from api.ticket_manager import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 3, 1, 12, 30, 45, 123456)
+    cursor = encode_cursor(created_at, 42)
+
+    assert decode_cursor(cursor) == (created_at, 42)
+    # Opaque and safe to pass in a query string
+    assert "|" not in cursor and "/" not in cursor and "+" not in cursor
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "Zm9vYmFy", encode_cursor(datetime(2024, 1, 1), 1)[:-4]])
+def test_invalid_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
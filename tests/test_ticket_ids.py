@@ -0,0 +1,38 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("psycopg2")
+
+from api.ticket_manager import TicketIdGenerator
+
+
+def test_ids_are_unique_across_threads():
+    generator = TicketIdGenerator()
+    ids = []
+    lock = threading.Lock()
+
+    def create(count):
+        local = [generator.next_id() for _ in range(count)]
+        with lock:
+            ids.extend(local)
+
+    threads = [threading.Thread(target=create, args=(2000,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(ids) == 16000
+    assert len(set(ids)) == len(ids)
+
+
+def test_separate_generators_use_different_worker_tags():
+    first, second = TicketIdGenerator(), TicketIdGenerator()
+
+    assert first.next_id().split("-")[3] != second.next_id().split("-")[3]
+    assert first.next_id().startswith("TKT-")
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.vector_store import NumpyVectorStore, matches_where
+
+METADATA = {"category": "tier1", "timestamp": 100, "source": "faq.txt"}
+
+
+def test_matches_where_operators():
+    assert matches_where(METADATA, {"category": "tier1"})
+    assert not matches_where(METADATA, {"category": {"$ne": "tier1"}})
+    assert matches_where(METADATA, {"timestamp": {"$gte": 100, "$lt": 200}})
+    assert not matches_where(METADATA, {"timestamp": {"$gt": 100}})
+    assert matches_where(METADATA, {"category": {"$in": ["bot", "tier1"]}})
+    assert matches_where(METADATA, {"category": {"$nin": ["escalate"]}})
+    # Range comparisons never match a missing field
+    assert not matches_where(METADATA, {"missing": {"$lte": 5}})
+
+
+def test_matches_where_combinators():
+    assert matches_where(METADATA, {"$and": [{"category": "tier1"}, {"timestamp": {"$lte": 100}}]})
+    assert not matches_where(METADATA, {"$and": [{"category": "tier1"}, {"timestamp": {"$lt": 100}}]})
+    assert matches_where(METADATA, {"$or": [{"category": "bot"}, {"source": "faq.txt"}]})
+    assert not matches_where(METADATA, {"$or": [{"category": "bot"}, {"source": "x"}]})
+
+
+def basis(i, dimensions=4):
+    vector = [0.0] * dimensions
+    vector[i] = 1.0
+    return vector
+
+
+def test_upsert_delete_and_persist_round_trip(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.add("faq", ["a", "b", "c"], ["doc a", "doc b", "doc c"],
+              [{"category": "bot"}, {"category": "tier1"}, {"category": "tier1"}],
+              [basis(0), basis(1), basis(2)])
+
+    # Upsert: "a" gets new text, metadata and vector
+    store.add("faq", ["a"], ["doc a v2"], [{"category": "escalate"}], [basis(3)])
+    result = store.query("faq", [basis(3)], n_results=1)
+    assert result["ids"] == [["a"]]
+    assert result["documents"] == [["doc a v2"]]
+    assert abs(result["distances"][0][0]) < 1e-6
+    assert store.count("faq") == 3
+
+    store.delete("faq", ["b"])
+    filtered = store.query("faq", [basis(1)], n_results=3, where={"category": "tier1"})
+    assert filtered["ids"] == [["c"]]
+
+    store.flush("faq")
+    reloaded = NumpyVectorStore(str(tmp_path))
+    assert reloaded.count("faq") == 2
+    got = reloaded.get("faq", ["a", "b", "c"], include_embeddings=True)
+    assert got["ids"] == ["a", "c"]
+    assert got["metadatas"][0] == {"category": "escalate"}
+    np.testing.assert_allclose(got["embeddings"][0], basis(3))
+    assert reloaded.query("faq", [basis(2)], n_results=1)["ids"] == [["c"]]
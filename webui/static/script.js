@@ -31,8 +31,8 @@ async function loadCategories() {
             // Add categories to the dropdown menu
             data.categories.forEach(category => {
                 const option = document.createElement('option');
-                option.value = category;
-                option.textContent = category;
+                option.value = category.name;
+                option.textContent = `${category.name} (${category.count})`;
                 categorySelect.appendChild(option);
             });
         }
@@ -156,32 +156,49 @@ async function askQuestion() {
             requestData.end_date = currentFilters.endDate;
         }
         
-        // Call the search API with filters - using /api/query endpoint for chat
-        const response = await fetch('/api/query', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(requestData)
-        });
+        // Stream the answer: sources arrive first, then the answer token by token
+        const botMessage = document.createElement('div');
+        botMessage.className = 'message bot';
+        botMessage.innerHTML = '<strong>ConvoSearch:</strong> ';
+        const answerText = document.createElement('span');
+        botMessage.appendChild(answerText);
+        let meta = null;
+        let answer = '';
         
-        const data = await response.json();
+        await streamQuery(requestData, {
+            sources: (data) => {
+                chatBox.appendChild(botMessage);
+                meta = data;
+            },
+            token: (data) => {
+                answer += data.text;
+                answerText.textContent = answer;
+                chatBox.scrollTop = chatBox.scrollHeight;
+            },
+            error: (data) => {
+                // An error can arrive before any sources event attached the message
+                if (!botMessage.isConnected) {
+                    chatBox.appendChild(botMessage);
+                }
+                answer += ` (${data.detail})`;
+                answerText.textContent = answer;
+            }
+        });
         
-        // Add bot response with sources and confidence
+        // Add sources and confidence once the answer is complete
         let sourcesHtml = '';
-        if (data.sources && data.sources.length > 0) {
-            sourcesHtml = `<div class="sources"><strong>Sources:</strong> ${data.sources.join(', ')}</div>`;
+        if (meta && meta.sources && meta.sources.length > 0) {
+            sourcesHtml = `<div class="sources"><strong>Sources:</strong> ${meta.sources.join(', ')}</div>`;
         }
         
         // Create results info showing count and active filters
-        const resultsInfo = createResultsInfo(data);
+        const resultsInfo = createResultsInfo({ answer: answer });
         
-        chatBox.innerHTML += `
-            <div class="message bot">
-                <strong>ConvoSearch:</strong> ${data.answer}
+        botMessage.insertAdjacentHTML('beforeend', `
                 ${sourcesHtml}
-                <div class="sources"><strong>Confidence:</strong> ${(data.confidence * 100).toFixed(1)}%</div>
+                <div class="sources"><strong>Confidence:</strong> ${((meta ? meta.confidence : 0) * 100).toFixed(1)}%</div>
                 ${resultsInfo}
-            </div>
-        `;
+        `);
         
     } catch (error) {
         console.error('Search error:', error);
@@ -193,6 +210,41 @@ async function askQuestion() {
     showLoading(false);
 }
 
+// POST to the streaming query endpoint and dispatch each Server-Sent Event to handlers[event]
+async function streamQuery(requestData, handlers) {
+    const response = await fetch('/api/query/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(requestData)
+    });
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            if (handlers[event]) handlers[event](JSON.parse(data));
+        }
+    }
+}
+
 // Show loading state during API calls
 function showLoading(show) {
     // You could add a loading spinner here if needed